@@ -3,8 +3,16 @@ Medical Knowledge-Based System (KBS) — Streamlit UI.
 Satisfies classical KBS: knowledge in JSON, inference in engine, explanation facility, read-only.
 """
 
+import atexit
+import copy
+import html
 import json
 import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
 from datetime import datetime
 
 import streamlit as st
@@ -12,9 +20,49 @@ import streamlit as st
 import knowledge_loader as loader
 import inference_engine as engine
 
+try:
+    import psutil
+    _HAS_PSUTIL = True
+except ImportError:
+    psutil = None
+    _HAS_PSUTIL = False
+
 # Max recent searches to keep in history
 MAX_RECENT_SEARCHES = 100
 
+# Cached results kept per search function (distinct queries typed in Browse)
+SEARCH_CACHE_ENTRIES = 256
+
+# Min seconds between symptom history writes (pending changes are also written at exit)
+HISTORY_FLUSH_INTERVAL = 5.0
+
+# Separators accepted in Manage list fields (commas and/or newlines)
+_LIST_SPLIT = re.compile(r"[,\n]+")
+
+# Sidebar navigation: page key -> label
+_PAGE_LABELS = {
+    "Home": "🏠 Home",
+    "Symptom Checker": "🧩 Symptom Checker",
+    "Explanation View": "📋 Explanation View",
+    "Disease Checker": "🔍 Disease Checker",
+    "Manage Diseases": "✏️ Manage",
+    "Symptom History": "📊 Symptom History",
+    "System Info": "⚙️ System Info",
+}
+
+# Disease fields shown in the edit form, in update_disease argument order, with empty defaults
+_EDIT_FIELDS = (("name", ""), ("description", ""), ("symptoms", []), ("diagnostics", []), ("treatment", []), ("references", ""))
+
+# Disease fields shown on a card, with the fallback for missing/empty values
+_CARD_FIELDS = (("name", "Unknown"), ("description", ""), ("symptoms", ()), ("diagnostics", ()), ("treatment", ()), ("references", ""))
+
+# Home page quick tips (one per session, picked at random)
+_TIPS = (
+    "Rules use partial matching: the more of a rule’s symptoms you have, the higher the confidence.",
+    "Explanation View shows the last Symptom Checker result — run a check first to see why each condition was suggested.",
+    "The knowledge base is read-only; rules and diseases are defined in data/knowledge_base.json.",
+)
+
 # -----------------------------------------------------------------------------
 # Page config and session state
 # -----------------------------------------------------------------------------
@@ -38,7 +86,7 @@ if "last_user_symptoms" not in st.session_state:
 # Styling (engaging medical UI: dark theme, stat tiles, tip box)
 # -----------------------------------------------------------------------------
 
-st.markdown("""
+_CSS = """
 <style>
     .stApp { background: linear-gradient(180deg, #0f172a 0%, #1e293b 50%, #0f172a 100%); }
     [data-testid="stSidebar"] { background: linear-gradient(180deg, #1e293b 0%, #0f172a 100%); }
@@ -49,6 +97,8 @@ st.markdown("""
         border-radius: 12px; padding: 1rem 1.25rem; text-align: center; margin: 0.5rem 0; }
     .stat-tile .value { font-size: 1.75rem; font-weight: 800; color: #38bdf8; }
     .stat-tile .label { font-size: 0.8rem; color: #94a3b8; text-transform: uppercase; letter-spacing: 0.05em; }
+    .stat-row { display: flex; gap: 1rem; }
+    .stat-row .stat-tile { flex: 1; }
     .tip-box { background: linear-gradient(135deg, #1e3a5f 0%, #1e293b 100%); border: 1px solid #475569;
         border-radius: 12px; padding: 1rem 1.25rem; margin: 1rem 0; }
     .tip-box .tip-title { font-size: 0.85rem; font-weight: 600; color: #38bdf8; margin-bottom: 0.35rem; }
@@ -71,33 +121,169 @@ st.markdown("""
     .rule-card-bc .rule-intro { color: #94a3b8; font-size: 0.8rem; margin-bottom: 0.4rem; }
     .rule-card-bc .rule-symptoms { color: #e2e8f0; margin: 0.25rem 0; font-size: 0.95rem; }
     .rule-card-bc .rule-outcome { color: #38bdf8; font-size: 0.9rem; margin-top: 0.35rem; }
+    .disease-card { background: linear-gradient(145deg, #1e293b 0%, #334155 100%); border: 1px solid #475569;
+        border-radius: 12px; padding: 1rem 1.25rem; margin: 0.75rem 0 0.5rem 0; }
+    .disease-card .card-name { font-size: 1.35rem; font-weight: 700; color: #f8fafc; margin-bottom: 0.5rem; }
+    .disease-card .conf-track { background: #0f172a; border-radius: 999px; height: 0.5rem; overflow: hidden; }
+    .disease-card .conf-fill { background: #38bdf8; height: 100%; }
+    .disease-card .conf-label { font-size: 0.8rem; color: #94a3b8; margin: 0.25rem 0 0.5rem 0; }
+    .disease-card .card-desc { color: #e2e8f0; font-size: 0.95rem; }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Re-emitted on every run: Streamlit drops elements a rerun does not send, so a
+# once-per-session guard would lose the styles. st.html sends a style-only block
+# to the event container, so it takes no layout slot.
+st.html(_CSS)
 
 
 # -----------------------------------------------------------------------------
 # Load knowledge once; fail gracefully with message
 # -----------------------------------------------------------------------------
 
-@st.cache_data(ttl=300)
-def _load_kb_cached():
-    """Cache loaded knowledge for performance (1000+ rules). Only successful loads are cached."""
-    return loader.load_knowledge(use_cache=True)
+def _kb_mtime() -> float:
+    """Modification time of data/knowledge_base.json; used as the cache key for derived data."""
+    return os.path.getmtime(loader.get_data_path())
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_kb_cached(mtime: float):
+    """
+    Loaded knowledge per file version (mtime): parsed once per change and shared by reference
+    across sessions, with no pickle copy per call. Callers must not mutate it; Manage edits a copy.
+    The loader's own cache is keyed by mtime and size, so a just-saved file is not re-parsed.
+    """
+    return loader.load_knowledge()
 
 
 def get_kb():
     try:
-        return _load_kb_cached()
+        mtime = _kb_mtime()
+        # Knowledge this session just saved is already in memory; skip re-reading the file
+        if st.session_state.get("_kb_mtime") == mtime and "_kb_cache" in st.session_state:
+            return st.session_state["_kb_cache"]
+        return _load_kb_cached(mtime)
     except Exception as e:
         st.error(f"Could not load knowledge base: {e}. Check data/knowledge_base.json.")
         return None
 
 
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _all_symptoms_cached(mtime: float, _kb: dict) -> tuple[str, ...]:
+    """All unique symptoms (facts, diseases, rules) for dropdowns; derived once per KB version, shared as an immutable tuple."""
+    return tuple(engine.get_all_symptoms_from_kb(_kb))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _rule_index(mtime: float, _kb: dict) -> dict:
+    """Engine rule index (vocabulary + CSR postings) for forward_chain; built once per KB version."""
+    rules = _kb.get("rules", [])
+    engine.warm_up(len(rules))  # compiles the Numba kernel only for KBs large enough to use it
+    return engine.build_rule_index(rules)
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _home_stats(mtime: float, _kb: dict) -> tuple[int, int]:
+    """(diseases, unique symptoms) for the Home stat tiles; computed once per KB version."""
+    return len(_kb.get("diseases", [])), len(_all_symptoms_cached(mtime, _kb))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _name_index(mtime: float, _kb: dict) -> tuple[tuple[str, int], ...]:
+    """(lowercased name, position in kb["diseases"]) for named diseases; case-folded once per KB version."""
+    return tuple((d["name"].lower(), i) for i, d in enumerate(_kb.get("diseases", [])) if d.get("name"))
+
+
+@st.cache_data(show_spinner=False, max_entries=SEARCH_CACHE_ENTRIES)
+def _search_name(query: str, mtime: float, _kb: dict) -> list[dict]:
+    """Diseases whose name contains query (case-insensitive); cached per (query, KB version)."""
+    q = query.strip().lower()
+    diseases = _kb.get("diseases", [])
+    return [diseases[i] for name, i in _name_index(mtime, _kb) if q in name]
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _symptom_index(mtime: float, _kb: dict) -> dict[str, list[int]]:
+    """Inverted index: lowercased symptom -> positions in kb["diseases"]; built once per KB version."""
+    idx: dict[str, list[int]] = {}
+    for i, d in enumerate(_kb.get("diseases", [])):
+        for s in d.get("symptoms") or []:
+            postings = idx.setdefault(str(s).strip().lower(), [])
+            if not postings or postings[-1] != i:
+                postings.append(i)
+    return idx
+
+
+@st.cache_data(show_spinner=False, max_entries=SEARCH_CACHE_ENTRIES)
+def _search_symptom(symptom: str, mtime: float, _kb: dict) -> list[dict]:
+    """Diseases that list the given symptom, ignoring case (posting-list lookup); cached per (symptom, KB version)."""
+    diseases = _kb.get("diseases", [])
+    return [diseases[i] for i in _symptom_index(mtime, _kb).get(symptom.strip().lower(), [])]
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _disease_name_list(mtime: float, _kb: dict) -> list[tuple[str, str]]:
+    """(id, display name) for every disease, for selectboxes; built once per KB version."""
+    return [(d.get("id", ""), (d.get("name") or "Unnamed").strip()) for d in _kb.get("diseases", [])]
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _disease_by_id(mtime: float, _kb: dict) -> dict[str, dict]:
+    """Disease id -> record (first wins, like engine.get_disease_by_id); built once per KB version."""
+    by_id: dict[str, dict] = {}
+    for d in _kb.get("diseases", []):
+        if isinstance(d, dict) and d.get("id"):
+            by_id.setdefault(d["id"], d)
+    return by_id
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _disease_name_map(mtime: float, _kb: dict) -> dict[str, str]:
+    """Disease id -> display name (first wins), for selectbox labels; built once per KB version."""
+    names: dict[str, str] = {}
+    for did, name in _disease_name_list(mtime, _kb):
+        names.setdefault(did, name)
+    return names
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _rule_labels(mtime: float, _kb: dict) -> tuple[str, ...]:
+    """'R1: a, b, c… → Disease' label per rule, for the Edit rule selectbox; built once per KB version."""
+    names = _disease_name_map(mtime, _kb)
+    labels = []
+    for r in _kb.get("rules", []):
+        if_syms = r.get("if_symptoms") or []
+        then_id = r.get("then_disease_id", "")
+        labels.append(f"{r.get('id', '')}: {', '.join(if_syms[:3])}{'…' if len(if_syms) > 3 else ''} → {names.get(then_id, then_id)}")
+    return tuple(labels)
+
+
+_KB_CACHES = (
+    _load_kb_cached, _all_symptoms_cached, _rule_index, _home_stats, _name_index, _search_name,
+    _symptom_index, _search_symptom, _disease_name_list, _disease_by_id, _disease_name_map, _rule_labels,
+)
+
+
+def _invalidate_kb_caches() -> None:
+    """Drop the KB-derived caches only (they are keyed by mtime, which may not change on a fast re-save)."""
+    for fn in _KB_CACHES:
+        fn.clear()
+
+
+def _save_kb(kb: dict) -> None:
+    """Save knowledge and keep it in session_state so the rerun after a Manage action skips re-parsing."""
+    st.session_state.pop("_kb_cache", None)  # a failed save must not leave unsaved edits cached
+    loader.save_knowledge_base(kb)
+    _invalidate_kb_caches()
+    st.session_state["_kb_cache"] = kb
+    st.session_state["_kb_mtime"] = _kb_mtime()
+
+
 def _parse_list_text(text: str) -> list[str]:
     """Parse newline- or comma-separated text into list of non-empty strings."""
     if not text or not text.strip():
         return []
-    return [s.strip() for s in text.replace(",", "\n").split("\n") if s.strip()]
+    return [s for s in (p.strip() for p in _LIST_SPLIT.split(text)) if s]
 
 
 def _symptom_history_path() -> str:
@@ -108,8 +294,7 @@ def _symptom_history_path() -> str:
 def _load_symptom_history() -> dict:
     path = _symptom_history_path()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return loader.read_json(path)
     except (FileNotFoundError, json.JSONDecodeError):
         return {"symptom_counts": {}, "recent_searches": []}
 
@@ -117,30 +302,82 @@ def _load_symptom_history() -> dict:
 def _save_symptom_history(data: dict) -> None:
     path = _symptom_history_path()
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    out = {"symptom_counts": dict(data.get("symptom_counts", {})), "recent_searches": list(data.get("recent_searches", []))}
+    loader.write_json(path, out)  # atomic: temp file + os.replace
+
 
+@st.cache_resource(show_spinner=False)
+def _history_exit_hook() -> dict:
+    """
+    Once per process: one exit hook that writes pending changes of the current history store.
+    Returns the holder _history_store puts the current store in.
+    """
+    current = {"store": None}
+    atexit.register(_flush_current_history, current)
+    return current
 
-def record_symptom_search(symptoms: list[str]) -> None:
+
+def _flush_current_history(current: dict) -> None:
+    if current["store"] is not None:
+        _flush_history(current["store"], force=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _history_store() -> dict:
+    """Process-wide symptom history: loaded once, updated in memory, written by _flush_history."""
+    current = _history_exit_hook()
+    if current["store"] is not None:  # replaced store: write it now so it never overwrites the new one later
+        _flush_history(current["store"], force=True)
+        current["store"] = None
+    data = _load_symptom_history()
+    data["symptom_counts"] = Counter(data.get("symptom_counts") or {})
+    data["recent_searches"] = deque(data.get("recent_searches") or [], maxlen=MAX_RECENT_SEARCHES)
+    store = {"data": data, "dirty": False, "flushed_at": 0.0, "lock": threading.Lock()}
+    current["store"] = store
+    return store
+
+
+def _flush_history(store: dict, force: bool = False) -> None:
+    """Write pending history changes, at most once per HISTORY_FLUSH_INTERVAL unless forced."""
+    with store["lock"]:
+        if not store["dirty"]:
+            return
+        now = time.monotonic()
+        if not force and now - store["flushed_at"] < HISTORY_FLUSH_INTERVAL:
+            return
+        _save_symptom_history(store["data"])
+        store["dirty"] = False
+        store["flushed_at"] = now
+
+
+def _history_snapshot() -> tuple[Counter, list]:
+    """Copies of (symptom_counts, recent_searches) for display."""
+    store = _history_store()
+    with store["lock"]:
+        data = store["data"]
+        return Counter(data["symptom_counts"]), list(data["recent_searches"])
+
+
+def record_symptom_search(symptoms: tuple[str, ...]) -> None:
     """Record a symptom check: update counts and append to recent searches."""
     if not symptoms:
         return
-    data = _load_symptom_history()
-    counts = data.get("symptom_counts", {})
-    for s in symptoms:
-        key = s.strip().lower()
-        if key:
-            counts[key] = counts.get(key, 0) + 1
-    data["symptom_counts"] = counts
-    recent = data.get("recent_searches", [])
-    recent.insert(0, {"symptoms": list(symptoms), "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")})
-    data["recent_searches"] = recent[:MAX_RECENT_SEARCHES]
-    _save_symptom_history(data)
+    store = _history_store()
+    with store["lock"]:
+        data = store["data"]
+        data["symptom_counts"].update(key for key in (s.strip().lower() for s in symptoms) if key)
+        data["recent_searches"].appendleft({"symptoms": symptoms, "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z"})
+        store["dirty"] = True
+    _flush_history(store)
 
 
 def clear_symptom_history() -> None:
     """Reset symptom counts and recent searches."""
-    _save_symptom_history({"symptom_counts": {}, "recent_searches": []})
+    store = _history_store()
+    with store["lock"]:
+        store["data"] = {"symptom_counts": Counter(), "recent_searches": deque(maxlen=MAX_RECENT_SEARCHES)}
+        store["dirty"] = True
+    _flush_history(store, force=True)
 
 
 # -----------------------------------------------------------------------------
@@ -221,28 +458,29 @@ def _build_explanation_txt(results: list[dict], user_symptoms: list[str]) -> str
 
 
 def render_disease_card(disease: dict, confidence: float | None = None):
-    name = disease.get("name") or "Unknown"
-    desc = disease.get("description") or ""
-    symptoms = disease.get("symptoms") or []
-    diagnostics = disease.get("diagnostics") or []
-    treatment = disease.get("treatment") or []
-    references = disease.get("references") or ""
-    st.subheader(name)
+    name, desc, symptoms, diagnostics, treatment, references = (disease.get(k) or default for k, default in _CARD_FIELDS)
+    # Name, confidence bar and description go out as one element instead of three
+    conf_html = ""
     if confidence is not None:
-        st.progress(confidence, text=f"Confidence: {confidence:.0%}")
-    st.write(desc)
+        conf_html = (
+            f'<div class="conf-track"><div class="conf-fill" style="width: {confidence:.0%}"></div></div>'
+            f'<div class="conf-label">Confidence: {confidence:.0%}</div>'
+        )
+    # name/description are free text from Manage forms: escape them, keep line breaks
+    desc_html = html.escape(desc).replace("\n", "<br>")
+    st.markdown(
+        f'<div class="disease-card"><div class="card-name">{html.escape(name)}</div>{conf_html}<div class="card-desc">{desc_html}</div></div>',
+        unsafe_allow_html=True,
+    )
     col1, col2 = st.columns(2)
     with col1:
         with st.expander("📋 Symptoms"):
-            for s in symptoms:
-                st.write(f"• {s}")
+            st.markdown("\n".join(f"- {s}" for s in symptoms))
     with col2:
         with st.expander("🔬 Diagnostics"):
-            for d in diagnostics:
-                st.write(f"• {d}")
+            st.markdown("\n".join(f"- {d}" for d in diagnostics))
     with st.expander("💊 Treatment"):
-        for t in treatment:
-            st.write(f"• {t}")
+        st.markdown("\n".join(f"- {t}" for t in treatment))
     if references:
         st.caption(f"📎 {references}")
     st.markdown("---")
@@ -252,52 +490,78 @@ def render_disease_card(disease: dict, confidence: float | None = None):
 # Pages
 # -----------------------------------------------------------------------------
 
+def _go_to(page: str) -> None:
+    """Button callback: switch page (runs before the rerun, so the nav radio can be updated)."""
+    st.session_state.page = page
+
+
 def page_home():
     st.markdown('<p class="hero-title">🩺 Medical Knowledge System</p>', unsafe_allow_html=True)
     st.markdown('<p class="hero-tagline">Search conditions by name or symptom, explore possible diagnoses, and manage the knowledge base — all in one place.</p>', unsafe_allow_html=True)
     kb = get_kb()
     if kb is None:
         return
-    n_diseases = len(kb.get("diseases", []))
-    n_symptoms = len(engine.get_all_symptoms_from_kb(kb)) if kb else 0
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        st.markdown(f'<div class="stat-tile"><div class="value">{n_diseases}</div><div class="label">Diseases in database</div></div>', unsafe_allow_html=True)
-    with c2:
-        st.markdown(f'<div class="stat-tile"><div class="value">{n_symptoms}</div><div class="label">Unique symptoms</div></div>', unsafe_allow_html=True)
-    with c3:
-        st.markdown('<div class="stat-tile"><div class="value">∞</div><div class="label">Searches you can run</div></div>', unsafe_allow_html=True)
+    n_diseases, n_symptoms = _home_stats(_kb_mtime(), kb)
+    # Three tiles in one flex row: one element instead of three columns with a markdown each
+    st.markdown(
+        '<div class="stat-row">'
+        f'<div class="stat-tile"><div class="value">{n_diseases}</div><div class="label">Diseases in database</div></div>'
+        f'<div class="stat-tile"><div class="value">{n_symptoms}</div><div class="label">Unique symptoms</div></div>'
+        '<div class="stat-tile"><div class="value">∞</div><div class="label">Searches you can run</div></div>'
+        '</div>',
+        unsafe_allow_html=True,
+    )
     st.markdown("**What do you want to do?**")
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("🧩 **Symptom Checker**\n\nEnter symptoms for possible conditions, or look up diseases by name/symptom.", use_container_width=True, key="home_symptom"):
-            st.session_state.page = "Symptom Checker"
-            st.rerun()
-        if st.button("📋 **Explanation View**\n\nSee which rules fired and why a condition was suggested.", use_container_width=True, key="home_explanation"):
-            st.session_state.page = "Explanation View"
-            st.rerun()
+        st.button("🧩 **Symptom Checker**\n\nEnter symptoms for possible conditions, or look up diseases by name/symptom.", use_container_width=True, key="home_symptom", on_click=_go_to, args=("Symptom Checker",))
+        st.button("📋 **Explanation View**\n\nSee which rules fired and why a condition was suggested.", use_container_width=True, key="home_explanation", on_click=_go_to, args=("Explanation View",))
     with col2:
-        if st.button("🔍 **Disease Checker**\n\nWhat symptoms would suggest a given condition?", use_container_width=True, key="home_disease_checker"):
-            st.session_state.page = "Disease Checker"
-            st.rerun()
-        if st.button("⚙️ **System Info**\n\nKnowledge version, load time, CPU/memory.", use_container_width=True, key="home_sysinfo"):
-            st.session_state.page = "System Info"
-            st.rerun()
-    if st.button("✏️ **Manage**\n\nManage diseases and rules in the knowledge base.", use_container_width=True, key="home_manage"):
-            st.session_state.page = "Manage Diseases"
-            st.rerun()
-    if st.button("📊 **Symptom History**\n\nView most asked symptoms and recent searches; clear history.", use_container_width=True, key="home_history"):
-            st.session_state.page = "Symptom History"
-            st.rerun()
+        st.button("🔍 **Disease Checker**\n\nWhat symptoms would suggest a given condition?", use_container_width=True, key="home_disease_checker", on_click=_go_to, args=("Disease Checker",))
+        st.button("⚙️ **System Info**\n\nKnowledge version, load time, CPU/memory.", use_container_width=True, key="home_sysinfo", on_click=_go_to, args=("System Info",))
+    st.button("✏️ **Manage**\n\nManage diseases and rules in the knowledge base.", use_container_width=True, key="home_manage", on_click=_go_to, args=("Manage Diseases",))
+    st.button("📊 **Symptom History**\n\nView most asked symptoms and recent searches; clear history.", use_container_width=True, key="home_history", on_click=_go_to, args=("Symptom History",))
     st.markdown("---")
-    import random
-    tips = [
-        "Rules use partial matching: the more of a rule’s symptoms you have, the higher the confidence.",
-        "Explanation View shows the last Symptom Checker result — run a check first to see why each condition was suggested.",
-        "The knowledge base is read-only; rules and diseases are defined in data/knowledge_base.json.",
-    ]
-    tip = random.choice(tips)
-    st.markdown(f'<div class="tip-box"><div class="tip-title">💡 Quick tip</div><div class="tip-text">{tip}</div></div>', unsafe_allow_html=True)
+    # Pick once per session so the tip doesn't change on every widget interaction
+    if "home_tip" not in st.session_state:
+        st.session_state.home_tip = random.choice(_TIPS)
+    st.markdown(f'<div class="tip-box"><div class="tip-title">💡 Quick tip</div><div class="tip-text">{st.session_state.home_tip}</div></div>', unsafe_allow_html=True)
+
+
+@st.fragment
+def _render_check_results(results: list[dict], symptoms: tuple[str, ...], kb: dict):
+    """Symptom Checker results as a fragment: the export button reruns only this block, not the whole page."""
+    st.success(f"**{len(results)}** possible condition(s) from rule matching.")
+    txt_content = _build_explanation_txt(results, symptoms)
+    st.download_button(
+        "📥 Export results as text",
+        data=txt_content,
+        file_name=f"symptom-checker-results-{datetime.utcnow().strftime('%Y%m%d-%H%M')}.txt",
+        mime="text/plain",
+        key="export_symptom_checker_txt",
+    )
+    # One table for the whole list, then a single card for the chosen condition
+    st.dataframe(
+        [
+            {"Condition": r["disease_name"], "Confidence": round(r["confidence"] * 100), "Matched symptoms": ", ".join(r["matched_symptoms"])}
+            for r in results
+        ],
+        column_config={"Confidence": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%d%%")},
+        use_container_width=True,
+        hide_index=True,
+    )
+    pick = st.selectbox(
+        "Show details for",
+        options=range(len(results)),
+        format_func=lambda i: results[i]["disease_name"],
+        key="check_result_detail",
+    )
+    r = results[pick]
+    disease = _disease_by_id(_kb_mtime(), kb).get(r["disease_id"])
+    if disease:
+        render_disease_card(disease, confidence=r["confidence"])
+        with st.expander("Why was this suggested?"):
+            st.write(r.get("explanation", ""))
 
 
 def page_symptom_checker():
@@ -317,21 +581,20 @@ def page_symptom_checker():
         if search_by == "Name":
             query = st.text_input("Disease name", placeholder="e.g. Asthma, Migraine", key="name_search")
             if query:
-                q = query.strip().lower()
-                results = [d for d in kb.get("diseases", []) if d.get("name") and q in d.get("name", "").lower()]
+                results = _search_name(query, _kb_mtime(), kb)
                 if not results:
                     st.info("No diseases found with that name.")
                 else:
                     for d in results:
                         render_disease_card(d)
         else:
-            all_symptoms = engine.get_all_symptoms_from_kb(kb)
+            all_symptoms = _all_symptoms_cached(_kb_mtime(), kb)
             if not all_symptoms:
                 st.warning("No symptoms in knowledge base.")
             else:
-                selected = st.selectbox("Select a symptom", options=[""] + all_symptoms, key="symptom_search")
+                selected = st.selectbox("Select a symptom", options=all_symptoms, index=None, placeholder="Choose a symptom…", key="symptom_search")
                 if selected:
-                    results = [d for d in kb.get("diseases", []) if selected in (d.get("symptoms") or [])]
+                    results = _search_symptom(selected, _kb_mtime(), kb)
                     if not results:
                         st.info("No diseases list this symptom.")
                     else:
@@ -339,7 +602,7 @@ def page_symptom_checker():
                         for d in results:
                             render_disease_card(d)
         return
-    all_symptoms = engine.get_all_symptoms_from_kb(kb)
+    all_symptoms = _all_symptoms_cached(_kb_mtime(), kb)
     input_method = st.radio(
         "How to enter symptoms",
         ["Select from list", "Type (comma-separated)"],
@@ -359,28 +622,15 @@ def page_symptom_checker():
         if not symptoms:
             st.warning("Enter or select at least one symptom.")
         else:
-            record_symptom_search(list(symptoms))
-            results = engine.forward_chain(symptoms, kb)
+            symptoms = tuple(symptoms)  # one immutable copy, shared by history, session state and the results
+            record_symptom_search(symptoms)
+            results = engine.forward_chain(symptoms, kb, index=_rule_index(_kb_mtime(), kb))
             st.session_state.last_inference_result = results
-            st.session_state.last_user_symptoms = list(symptoms)
+            st.session_state.last_user_symptoms = symptoms
             if not results:
                 st.info("No rules matched these symptoms. Try different or additional symptoms.")
             else:
-                st.success(f"**{len(results)}** possible condition(s) from rule matching.")
-                txt_content = _build_explanation_txt(results, list(symptoms))
-                st.download_button(
-                    "📥 Export results as text",
-                    data=txt_content,
-                    file_name=f"symptom-checker-results-{datetime.utcnow().strftime('%Y%m%d-%H%M')}.txt",
-                    mime="text/plain",
-                    key="export_symptom_checker_txt",
-                )
-                for r in results:
-                    disease = engine.get_disease_by_id(r["disease_id"], kb)
-                    if disease:
-                        render_disease_card(disease, confidence=r["confidence"])
-                        with st.expander("Why was this suggested?"):
-                            st.write(r.get("explanation", ""))
+                _render_check_results(results, symptoms, kb)
     else:
         last_results = st.session_state.get("last_inference_result", [])
         last_symptoms = st.session_state.get("last_user_symptoms", [])
@@ -444,11 +694,12 @@ def page_backward_chaining():
     if not diseases:
         st.warning("No diseases in the knowledge base. Add some in **Manage**.")
         return
-    disease_options = [(d.get("id", ""), (d.get("name") or "Unnamed").strip()) for d in diseases]
+    disease_options = _disease_name_list(_kb_mtime(), kb)
+    disease_names = _disease_name_map(_kb_mtime(), kb)
     choice = st.selectbox(
         "**Select a condition**",
         options=[did for did, _ in disease_options],
-        format_func=lambda x: next((n for i, n in disease_options if i == x), x),
+        format_func=lambda x: disease_names.get(x, x),
         key="backward_disease_choice",
         placeholder="Choose a disease…",
     )
@@ -462,11 +713,12 @@ def page_backward_chaining():
         st.warning("Disease not found.")
         return
     disease_name = result["disease_name"]
-    disease_record = engine.get_disease_by_id(choice, kb)
+    disease_record = _disease_by_id(_kb_mtime(), kb).get(choice)
     st.markdown("---")
     st.markdown(f"#### {disease_name}")
-    if disease_record and (disease_record.get("description") or "").strip():
-        st.caption((disease_record.get("description") or "").strip())
+    desc = (disease_record.get("description") or "").strip() if disease_record else ""
+    if desc:
+        st.caption(desc)
     st.markdown("")
     if not result["all_symptoms"]:
         st.info("No rules conclude this disease yet. Add rules in **Manage → Rules** that have this condition as **THEN** to see which symptoms suggest it.")
@@ -498,7 +750,8 @@ def page_manage_diseases():
         return
     diseases = kb.get("diseases", [])
     rules = kb.get("rules", [])
-    disease_options = [(d.get("id", ""), d.get("name", "") or "Unnamed") for d in diseases]
+    disease_options = _disease_name_list(_kb_mtime(), kb)
+    disease_names = _disease_name_map(_kb_mtime(), kb)
 
     tab_symptoms, tab_diseases, tab_rules = st.tabs(["🩺 Symptoms", "📋 Diseases", "📐 Rules"])
 
@@ -514,10 +767,10 @@ def page_manage_diseases():
                     st.warning("Enter at least one symptom.")
                 else:
                     try:
+                        kb = copy.deepcopy(kb)  # get_kb may return the session's cached dict; edit a copy
                         for name in to_add:
                             kb = loader.add_symptom(kb, name)
-                        loader.save_knowledge_base(kb)
-                        st.cache_data.clear()
+                        _save_kb(kb)
                         st.success(f"Added {len(to_add)} symptom(s).")
                         st.rerun()
                     except Exception as e:
@@ -538,18 +791,16 @@ def page_manage_diseases():
                             edit_symptom_delete = st.form_submit_button("Delete symptom")
                     if edit_symptom_save and edit_symptom_new and edit_symptom_new.strip() != edit_sym_choice:
                         try:
-                            kb = loader.update_symptom(kb, edit_sym_choice, edit_symptom_new.strip())
-                            loader.save_knowledge_base(kb)
-                            st.cache_data.clear()
+                            kb = loader.update_symptom(copy.deepcopy(kb), edit_sym_choice, edit_symptom_new.strip())
+                            _save_kb(kb)
                             st.success(f"Renamed to **{edit_symptom_new.strip()}**.")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Failed to rename: {e}")
                     if edit_symptom_delete:
                         try:
-                            kb = loader.delete_symptom(kb, edit_sym_choice)
-                            loader.save_knowledge_base(kb)
-                            st.cache_data.clear()
+                            kb = loader.delete_symptom(copy.deepcopy(kb), edit_sym_choice)
+                            _save_kb(kb)
                             st.success("Symptom removed from knowledge base.")
                             st.rerun()
                         except Exception as e:
@@ -567,9 +818,8 @@ def page_manage_diseases():
                 add_submitted = st.form_submit_button("Save new disease")
             if add_submitted and add_name and add_name.strip():
                 try:
-                    kb = loader.add_disease(kb, add_name.strip(), add_description or "", _parse_list_text(add_symptoms), _parse_list_text(add_diagnostics), _parse_list_text(add_treatment), add_references or "")
-                    loader.save_knowledge_base(kb)
-                    st.cache_data.clear()
+                    kb = loader.add_disease(copy.deepcopy(kb), add_name.strip(), add_description or "", _parse_list_text(add_symptoms), _parse_list_text(add_diagnostics), _parse_list_text(add_treatment), add_references or "")
+                    _save_kb(kb)
                     st.success(f"Added **{add_name.strip()}**.")
                     st.rerun()
                 except Exception as e:
@@ -581,11 +831,9 @@ def page_manage_diseases():
             if not diseases:
                 st.info("No diseases yet. Use **Add new disease** above.")
             else:
-                edit_options = [d.get("name", "") or "Unnamed" for d in diseases]
-                edit_choice = st.selectbox("Select disease to edit", options=edit_options, key="edit_choice", placeholder="Choose one…")
-                selected_idx = edit_options.index(edit_choice)
-                edit_id = diseases[selected_idx].get("id")
-                current = loader.get_disease_by_id(edit_id, kb)
+                id_to_disease = {d.get("id"): d for d in diseases}
+                edit_id = st.selectbox("Select disease to edit", options=list(id_to_disease), format_func=lambda i: id_to_disease[i].get("name") or "Unnamed", key="edit_choice", placeholder="Choose one…")
+                current = id_to_disease.get(edit_id)
                 if current:
                     form_key = f"edit_form_{edit_id}"
                     with st.form(form_key):
@@ -601,36 +849,30 @@ def page_manage_diseases():
                         with col2:
                             delete_submitted = st.form_submit_button("Delete disease")
                     if edit_submitted and edit_name and edit_name.strip():
-                        try:
-                            kb = loader.update_disease(kb, edit_id, edit_name.strip(), edit_description or "", _parse_list_text(edit_symptoms), _parse_list_text(edit_diagnostics), _parse_list_text(edit_treatment), edit_references or "")
-                            loader.save_knowledge_base(kb)
-                            st.cache_data.clear()
-                            st.success(f"Updated **{edit_name.strip()}**.")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Failed to save: {e}")
+                        edited = (edit_name.strip(), (edit_description or "").strip(), _parse_list_text(edit_symptoms), _parse_list_text(edit_diagnostics), _parse_list_text(edit_treatment), (edit_references or "").strip())
+                        stored = tuple(current.get(k) or default for k, default in _EDIT_FIELDS)
+                        if edited == stored:
+                            st.info("No changes to save.")  # skip the full JSON write and rerun
+                        else:
+                            try:
+                                kb = loader.update_disease(copy.deepcopy(kb), edit_id, *edited)
+                                _save_kb(kb)
+                                st.success(f"Updated **{edit_name.strip()}**.")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Failed to save: {e}")
                     if delete_submitted:
                         try:
-                            kb = loader.delete_disease(kb, edit_id)
-                            loader.save_knowledge_base(kb)
-                            st.cache_data.clear()
+                            kb = loader.delete_disease(copy.deepcopy(kb), edit_id)
+                            _save_kb(kb)
                             st.success("Disease removed.")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Failed to delete: {e}")
 
     with tab_rules:
-        all_symptom_options = engine.get_all_symptoms_from_kb(kb)
-
-        def _next_rule_id(kb_dict):
-            existing = {r.get("id", "") for r in kb_dict.get("rules", []) if isinstance(r, dict)}
-            i = 1
-            while f"R{i}" in existing:
-                i += 1
-            return f"R{i}"
-
         add_rule_submitted = False
-        next_rid = _next_rule_id(kb)
+        next_rid = loader.next_rule_id(kb)
         with st.expander("➕ Add new rule", expanded=False):
             if not disease_options:
                 st.info("Add at least one disease above before adding rules.")
@@ -639,7 +881,7 @@ def page_manage_diseases():
                     st.caption("Rule ID (auto)")
                     st.text(next_rid)
                     add_if_symptoms = st.text_area("IF symptoms (one per line)", key="add_rule_if", placeholder="runny nose\nsore throat\ncough", height=100)
-                    add_then_id = st.selectbox("THEN disease", options=[did for did, _ in disease_options], format_func=lambda x: next((n for i, n in disease_options if i == x), x), key="add_rule_then")
+                    add_then_id = st.selectbox("THEN disease", options=[did for did, _ in disease_options], format_func=lambda x: disease_names.get(x, x), key="add_rule_then")
                     add_confidence = st.number_input("Confidence (0–1)", min_value=0.0, max_value=1.0, value=0.8, step=0.05, key="add_rule_conf")
                     add_rule_submitted = st.form_submit_button("Save new rule")
             if add_rule_submitted and disease_options:
@@ -647,9 +889,8 @@ def page_manage_diseases():
                     st.warning("Select a disease (THEN).")
                 else:
                     try:
-                        kb = loader.add_rule(kb, next_rid, _parse_list_text(add_if_symptoms), add_then_id, add_confidence)
-                        loader.save_knowledge_base(kb)
-                        st.cache_data.clear()
+                        kb = loader.add_rule(copy.deepcopy(kb), "", _parse_list_text(add_if_symptoms), add_then_id, add_confidence)
+                        _save_kb(kb)
                         st.success("Rule added.")
                         st.rerun()
                     except Exception as e:
@@ -659,9 +900,8 @@ def page_manage_diseases():
             if not rules:
                 st.info("No rules yet. Add a rule above.")
             else:
-                rule_options = [f"{r.get('id', '')}: {', '.join((r.get('if_symptoms') or [])[:3])}{'…' if len(r.get('if_symptoms') or []) > 3 else ''} → {next((n for i, n in disease_options if i == r.get('then_disease_id')), r.get('then_disease_id', ''))}" for r in rules]
-                rule_choice = st.selectbox("Select rule to edit", options=rule_options, key="rule_edit_choice")
-                rule_idx = rule_options.index(rule_choice)
+                rule_labels = _rule_labels(_kb_mtime(), kb)
+                rule_idx = st.selectbox("Select rule to edit", options=range(len(rule_labels)), format_func=rule_labels.__getitem__, key="rule_edit_choice")
                 rule_id = rules[rule_idx].get("id")
                 current_rule = loader.get_rule_by_id(rule_id, kb)
                 if current_rule:
@@ -671,7 +911,7 @@ def page_manage_diseases():
                         edit_rule_if = st.text_area("IF symptoms (one per line)", value="\n".join(current_rule.get("if_symptoms", [])), key=f"edit_rule_if_{rule_id}", height=100)
                         rule_then_ids = [did for did, _ in disease_options]
                         rule_then_idx = rule_then_ids.index(current_rule.get("then_disease_id")) if current_rule.get("then_disease_id") in rule_then_ids else 0
-                        edit_rule_then = st.selectbox("THEN disease", options=rule_then_ids, index=rule_then_idx, format_func=lambda x: next((n for i, n in disease_options if i == x), x), key=f"edit_rule_then_{rule_id}")
+                        edit_rule_then = st.selectbox("THEN disease", options=rule_then_ids, index=rule_then_idx, format_func=lambda x: disease_names.get(x, x), key=f"edit_rule_then_{rule_id}")
                         edit_rule_conf = st.number_input("Confidence (0–1)", min_value=0.0, max_value=1.0, value=float(current_rule.get("confidence", 0.8)), step=0.05, key=f"edit_rule_conf_{rule_id}")
                         col1, col2 = st.columns(2)
                         with col1:
@@ -680,18 +920,16 @@ def page_manage_diseases():
                             delete_rule_submitted = st.form_submit_button("Delete rule")
                     if edit_rule_submitted:
                         try:
-                            kb = loader.update_rule(kb, rule_id, _parse_list_text(edit_rule_if), edit_rule_then, edit_rule_conf)
-                            loader.save_knowledge_base(kb)
-                            st.cache_data.clear()
+                            kb = loader.update_rule(copy.deepcopy(kb), rule_id, _parse_list_text(edit_rule_if), edit_rule_then, edit_rule_conf)
+                            _save_kb(kb)
                             st.success("Rule updated.")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Failed to save: {e}")
                     if delete_rule_submitted:
                         try:
-                            kb = loader.delete_rule(kb, rule_id)
-                            loader.save_knowledge_base(kb)
-                            st.cache_data.clear()
+                            kb = loader.delete_rule(copy.deepcopy(kb), rule_id)
+                            _save_kb(kb)
                             st.success("Rule removed.")
                             st.rerun()
                         except Exception as e:
@@ -701,16 +939,14 @@ def page_manage_diseases():
 def page_symptom_history():
     st.markdown("### 📊 Symptom History")
     st.caption("Most asked symptoms and recent symptom checks. Manage or clear history below.")
-    data = _load_symptom_history()
-    counts = data.get("symptom_counts", {})
-    recent = data.get("recent_searches", [])
+    _flush_history(_history_store())
+    counts, recent = _history_snapshot()
 
     st.markdown("**Most asked symptoms**")
     if not counts:
         st.info("No symptom checks recorded yet. Use **Symptom Checker** to run a search.")
     else:
-        sorted_symptoms = sorted(counts.items(), key=lambda x: -x[1])
-        for i, (symptom, count) in enumerate(sorted_symptoms, 1):
+        for i, (symptom, count) in enumerate(counts.most_common(), 1):
             st.write(f"{i}. **{symptom}** — searched {count} time(s)")
     st.markdown("---")
     st.markdown("**Recent searches**")
@@ -728,6 +964,19 @@ def page_symptom_history():
         st.rerun()
 
 
+@st.cache_resource(show_spinner=False)
+def _start_cpu_sampling() -> bool:
+    """Once per process: psutil measures cpu_percent(interval=None) from the previous call, so make a first one."""
+    psutil.cpu_percent(interval=None)
+    return True
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def _system_usage() -> tuple[float, float]:
+    """(CPU %, memory %) without blocking; CPU is averaged since the previous sample. Reused for 2 s."""
+    return psutil.cpu_percent(interval=None), psutil.virtual_memory().percent
+
+
 def page_system_info():
     st.markdown("### ⚙️ System Info")
     info = loader.get_load_info()
@@ -739,17 +988,21 @@ def page_system_info():
     if info.get("validation_errors"):
         st.warning("Validation issues: " + "; ".join(info["validation_errors"][:5]))
     st.markdown("**System monitoring**")
-    try:
-        import psutil
+    if _HAS_PSUTIL:
+        cpu, mem = _system_usage()
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("CPU usage", f"{psutil.cpu_percent(interval=0.5):.1f}%")
+            st.metric("CPU usage", f"{cpu:.1f}%")
         with col2:
-            st.metric("Memory usage", f"{psutil.virtual_memory().percent:.1f}%")
-    except ImportError:
+            st.metric("Memory usage", f"{mem:.1f}%")
+    else:
         st.info("Install **psutil** for CPU and memory display. The app runs without it.")
 
 
+if _HAS_PSUTIL:
+    _start_cpu_sampling()  # so the first System Info visit already has a measuring window
+
+
 # -----------------------------------------------------------------------------
 # Sidebar navigation
 # -----------------------------------------------------------------------------
@@ -757,28 +1010,8 @@ def page_system_info():
 with st.sidebar:
     st.markdown("### 🩺 Medical KBS")
     st.markdown("---")
-    cur = st.session_state.page
-    if st.button(("🏠 Home" + (" ✓" if cur == "Home" else "")), use_container_width=True, key="nav_home", type="primary" if cur == "Home" else "secondary"):
-        st.session_state.page = "Home"
-        st.rerun()
-    if st.button(("🧩 Symptom Checker" + (" ✓" if cur == "Symptom Checker" else "")), use_container_width=True, key="nav_symptom", type="primary" if cur == "Symptom Checker" else "secondary"):
-        st.session_state.page = "Symptom Checker"
-        st.rerun()
-    if st.button(("📋 Explanation View" + (" ✓" if cur == "Explanation View" else "")), use_container_width=True, key="nav_explanation", type="primary" if cur == "Explanation View" else "secondary"):
-        st.session_state.page = "Explanation View"
-        st.rerun()
-    if st.button(("🔍 Disease Checker" + (" ✓" if cur == "Disease Checker" else "")), use_container_width=True, key="nav_disease_checker", type="primary" if cur == "Disease Checker" else "secondary"):
-        st.session_state.page = "Disease Checker"
-        st.rerun()
-    if st.button(("✏️ Manage" + (" ✓" if cur == "Manage Diseases" else "")), use_container_width=True, key="nav_manage", type="primary" if cur == "Manage Diseases" else "secondary"):
-        st.session_state.page = "Manage Diseases"
-        st.rerun()
-    if st.button(("📊 Symptom History" + (" ✓" if cur == "Symptom History" else "")), use_container_width=True, key="nav_history", type="primary" if cur == "Symptom History" else "secondary"):
-        st.session_state.page = "Symptom History"
-        st.rerun()
-    if st.button(("⚙️ System Info" + (" ✓" if cur == "System Info" else "")), use_container_width=True, key="nav_sysinfo", type="primary" if cur == "System Info" else "secondary"):
-        st.session_state.page = "System Info"
-        st.rerun()
+    # Bound to st.session_state.page: one widget, one rerun per navigation
+    st.radio("Navigation", options=list(_PAGE_LABELS), format_func=_PAGE_LABELS.get, key="page", label_visibility="collapsed")
     st.markdown("---")
 
 # -----------------------------------------------------------------------------
@@ -5,8 +5,34 @@ Knowledge (rules in JSON) is separate from this reasoning logic.
 Returns matched diseases with confidence and full explanation data.
 """
 
+import sys
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
 from typing import Any
 
+try:
+    import numpy as np
+except ImportError:  # NumPy ships with Streamlit; the engine falls back to pure Python without it
+    np = None
+
+try:
+    import numba
+except ImportError:  # optional JIT kernel for very large rule bases
+    numba = None
+
+from utils.caching import per_list_cache
+from utils.matching import build_substring_index, match_columns, symptoms_match
+
+# Rule count from which the Numba kernel replaces the matrix-vector product
+# (below it, JIT compile time outweighs the saving).
+NUMBA_MIN_RULES = 10000
+
+# forward_chain results kept per rule index, keyed by the set of normalized queries
+RESULT_MEMO_SIZE = 256
+_memo_lock = threading.Lock()
+
 # -----------------------------------------------------------------------------
 # Normalization (consistent matching between user input and rule antecedents)
 # -----------------------------------------------------------------------------
@@ -15,15 +41,192 @@ from typing import Any
 def _normalize(s: str) -> str:
     if not s or not isinstance(s, str):
         return ""
-    return " ".join(s.strip().lower().split())
+    return _normalize_str(s)
+
+
+@lru_cache(maxsize=8192)
+def _normalize_str(s: str) -> str:
+    """Memoized: the same few symptom strings are normalized over and over."""
+    return sys.intern(" ".join(s.strip().lower().split()))
 
 
 def _symptom_matches(user_symptom: str, rule_symptom: str) -> bool:
-    u = _normalize(user_symptom)
-    r = _normalize(rule_symptom)
-    if not u or not r:
-        return False
-    return u == r or u in r or r in u
+    return symptoms_match(_normalize(user_symptom), _normalize(rule_symptom))
+
+
+# -----------------------------------------------------------------------------
+# Result records (forward_chain builds these and returns them as plain dicts)
+# -----------------------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class FiredRule:
+    """A rule that fired for a result, with the IF symptoms it matched."""
+
+    rule_id: str
+    matched_symptoms: list[str]
+    rule_confidence: float
+
+    def to_dict(self) -> dict:
+        return {"rule_id": self.rule_id, "matched_symptoms": list(self.matched_symptoms), "rule_confidence": self.rule_confidence}
+
+
+@dataclass(slots=True)
+class MatchResult:
+    """A concluded disease: best confidence over its fired rules, matched symptoms, explanation."""
+
+    disease_id: str
+    disease_name: str
+    confidence: float
+    fired_rules: list[FiredRule] = field(default_factory=list)
+    matched_symptoms: list[str] = field(default_factory=list)
+    explanation: str = ""
+
+    def to_dict(self) -> dict:
+        """Fresh dict (with fresh lists), so a memoized result is never modified by callers."""
+        return {
+            "disease_id": self.disease_id,
+            "disease_name": self.disease_name,
+            "confidence": self.confidence,
+            "fired_rules": [fr.to_dict() for fr in self.fired_rules],
+            "matched_symptoms": list(self.matched_symptoms),
+            "explanation": self.explanation,
+        }
+
+
+# -----------------------------------------------------------------------------
+# Rule index (build once per KB version and pass to forward_chain)
+# -----------------------------------------------------------------------------
+
+
+def build_rule_index(rules: list) -> dict:
+    """
+    Precompute per-rule data for forward chaining: a vocabulary of unique normalized
+    rule symptoms and, for each rule, the vocabulary column of each IF symptom (-1 if
+    it can never match). An inverted index (column -> rule positions, one per
+    occurrence) lets a query touch only the rules that mention a matched symptom.
+    With NumPy, the columns are also stored CSR-style (row pointer + flat column
+    array) and CSC-style, so matches for every rule come from a few array ops.
+    The index holds no reference to the KB; callers cache it per KB version.
+    """
+    vocab: dict[str, int] = {}
+    postings: list[list[int]] = []  # column -> rule positions
+    entries = []  # (rule_id, if_symptoms, columns, then_disease_id, confidence)
+    for rule in rules:
+        if not isinstance(rule, dict):
+            continue
+        if_syms = rule.get("if_symptoms") or []
+        cols = []
+        for rs in if_syms:
+            n = _normalize(rs)
+            if not n:
+                cols.append(-1)
+                continue
+            c = vocab.setdefault(n, len(vocab))
+            if c == len(postings):
+                postings.append([])
+            postings[c].append(len(entries))
+            cols.append(c)
+        entries.append((rule.get("id", ""), if_syms, cols, rule.get("then_disease_id"), rule.get("confidence", 0.5)))
+
+    csr = None
+    if np is not None and entries and vocab:
+        flat = [[c for c in cols if c >= 0] for _, _, cols, _, _ in entries]
+        lengths = np.fromiter((len(f) for f in flat), dtype=np.int32, count=len(flat))
+        ptr = np.zeros(len(flat) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=ptr[1:])
+        csr = {
+            "ptr": ptr,
+            "cols": np.fromiter((c for f in flat for c in f), dtype=np.int32, count=int(ptr[-1])),
+            "rows": np.repeat(np.arange(len(flat), dtype=np.int32), lengths),
+            "n_vocab": len(vocab),
+            # CSC view: col_ptr[c]:col_ptr[c + 1] slices the rule positions of column c
+            "col_ptr": np.concatenate(([0], np.cumsum([len(p) for p in postings]))).astype(np.int32),
+            "col_rows": np.fromiter((r for p in postings for r in p), dtype=np.int32, count=sum(len(p) for p in postings)),
+            # Per-rule IF length (incl. unmatchable symptoms) and base confidence, for vectorized scaling
+            "n_if": np.fromiter((len(e[1]) for e in entries), dtype=np.float64, count=len(entries)),
+            "conf": np.fromiter((float(e[4]) for e in entries), dtype=np.float64, count=len(entries)),
+        }
+    # Substring lookup tables for _matched_cols
+    text = build_substring_index(vocab)
+    # Filled by _matched_cols: matched columns for queries that are themselves vocabulary
+    # entries (the dropdown case), so a repeated exact query skips the substring scan
+    exact: dict[str, frozenset[int]] = {}
+    return {"vocab": vocab, "entries": entries, "postings": postings, "csr": csr, "text": text, "exact": exact, "memo": {}}
+
+
+def _matched_cols(index: dict, queries: list[str]) -> set[int]:
+    """
+    Vocabulary columns matching any normalized query (equal, query inside rule symptom,
+    or rule symptom inside query; see utils.matching.match_columns). A query equal to a
+    vocabulary entry is scanned once per index; later calls reuse its columns.
+    """
+    vocab, exact = index["vocab"], index["exact"]
+    cols: set[int] = set()
+    for q in queries:
+        hit = exact.get(q)
+        if hit is None:
+            hit = match_columns(index["text"], q)
+            if q in vocab:
+                exact[q] = frozenset(hit)
+        cols.update(hit)
+    return cols
+
+
+if numba is not None and np is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _hits_kernel(ptr, cols, hit_mask):
+        """Per-rule matched count over the CSR rows (compiled on first use)."""
+        n = ptr.shape[0] - 1
+        out = np.zeros(n, dtype=np.int64)
+        for i in numba.prange(n):
+            h = 0
+            for k in range(ptr[i], ptr[i + 1]):
+                h += hit_mask[cols[k]]
+            out[i] = h
+        return out
+else:
+    _hits_kernel = None
+
+
+def warm_up(n_rules: int) -> None:
+    """Compile the optional Numba kernel ahead of the first query, only if it will be used."""
+    if _hits_kernel is not None and n_rules >= NUMBA_MIN_RULES:
+        _hits_kernel(np.zeros(2, dtype=np.int32), np.zeros(1, dtype=np.int32), np.zeros(1, dtype=np.uint8))
+
+
+def _score_rules(index: dict, hit_cols: set[int]) -> tuple[list[int], list[float]]:
+    """
+    Rules with at least one matched IF symptom (ascending position), and their scaled
+    confidence rule_confidence * (matched / total), unrounded.
+    """
+    entries = index["entries"]
+    csr = index["csr"]
+    if csr is None:
+        counts: dict[int, int] = {}
+        for c in hit_cols:
+            for i in index["postings"][c]:
+                counts[i] = counts.get(i, 0) + 1
+        fired = sorted(counts)
+        return fired, [entries[i][4] * (counts[i] / len(entries[i][1])) for i in fired]
+    n_rules = len(csr["ptr"]) - 1
+    col_ptr = csr["col_ptr"]
+    n_postings = sum(int(col_ptr[c + 1] - col_ptr[c]) for c in hit_cols)
+    if n_postings < n_rules:
+        # Sparse query: gather only the postings of the matched columns
+        rows = np.concatenate([csr["col_rows"][col_ptr[c]:col_ptr[c + 1]] for c in hit_cols])
+        fired, hits = np.unique(rows, return_counts=True)
+    else:
+        hit_mask = np.zeros(csr["n_vocab"], dtype=np.uint8)
+        hit_mask[list(hit_cols)] = 1
+        if _hits_kernel is not None and n_rules >= NUMBA_MIN_RULES:
+            all_hits = _hits_kernel(csr["ptr"], csr["cols"], hit_mask)
+        else:
+            all_hits = np.bincount(csr["rows"][hit_mask[csr["cols"]].astype(bool)], minlength=n_rules)
+        fired = np.flatnonzero(all_hits)
+        hits = all_hits[fired]
+    scores = csr["conf"][fired] * (hits / csr["n_if"][fired])
+    return fired.tolist(), scores.tolist()
 
 
 # -----------------------------------------------------------------------------
@@ -31,7 +234,7 @@ def _symptom_matches(user_symptom: str, rule_symptom: str) -> bool:
 # -----------------------------------------------------------------------------
 
 
-def forward_chain(user_symptoms: list[str], kb: dict) -> list[dict]:
+def forward_chain(user_symptoms: list[str], kb: dict, index: dict | None = None) -> list[dict]:
     """
     Forward chaining: find all rules whose IF part is (fully or partially) satisfied
     by user symptoms, then return concluded diseases with confidence and explanation.
@@ -39,95 +242,114 @@ def forward_chain(user_symptoms: list[str], kb: dict) -> list[dict]:
     A rule fires when at least one symptom in rule.if_symptoms matches a user symptom.
     Confidence is scaled by how many rule symptoms matched: rule_confidence * (matched / total).
     Multiple rules can fire for the same disease; overall confidence is the maximum over firing rules.
+
+    index: optional result of build_rule_index(kb["rules"]); pass a cached one to skip rebuilding it
+    and to reuse results for symptom combinations seen before.
     """
     user_symptoms = [s.strip() for s in user_symptoms if s and s.strip()]
     if not user_symptoms:
         return []
 
-    diseases_by_id = {d["id"]: d for d in kb.get("diseases", []) if isinstance(d, dict) and d.get("id")}
-    rules = kb.get("rules", [])
-    results: dict[str, dict] = {}  # disease_id -> result entry
+    diseases_by_id = _diseases_by_id(kb)
+    if index is None:
+        index = build_rule_index(kb.get("rules", []))
 
-    for rule in rules:
-        if not isinstance(rule, dict):
-            continue
-        if_syms = rule.get("if_symptoms") or []
-        then_id = rule.get("then_disease_id")
-        base_confidence = rule.get("confidence", 0.5)
-        rule_id = rule.get("id", "")
+    # Normalize the query once; vocab keys are already normalized, so match them directly
+    queries = [q for q in (_normalize(us) for us in user_symptoms) if q]
+    # The result depends only on the set of queries (and the disease records it names),
+    # so a repeated combination is answered from the index's memo
+    memo, memo_key = index["memo"], frozenset(queries)
+    with _memo_lock:
+        hit = memo.pop(memo_key, None)
+        if hit is not None:
+            memo[memo_key] = hit  # most recently used goes last
+    if hit is not None and hit[0] is diseases_by_id:
+        return [r.to_dict() for r in hit[1]]
 
-        matched_in_rule = []
-        for rs in if_syms:
-            if any(_symptom_matches(us, rs) for us in user_symptoms):
-                matched_in_rule.append(rs)
+    out = _finish(_fire_rules(index, queries, diseases_by_id))
+    with _memo_lock:
+        if len(memo) >= RESULT_MEMO_SIZE:
+            memo.pop(next(iter(memo)))
+        memo[memo_key] = (diseases_by_id, out)
+    return [r.to_dict() for r in out]
 
-        # Fire if at least one rule symptom matched (partial match)
-        if not matched_in_rule or not then_id:
-            continue
 
-        # Scale confidence by fraction of rule symptoms matched
-        rule_confidence = round(base_confidence * (len(matched_in_rule) / len(if_syms)), 2)
+def _fire_rules(index: dict, queries: list[str], diseases_by_id: dict) -> list[MatchResult]:
+    """Results of the rules matching the queries, in order of each disease's first firing rule."""
+    results: dict[str, MatchResult] = {}  # disease_id -> result entry
+    matched_seen: dict[str, set[str]] = {}  # disease_id -> symptoms already in its matched_symptoms
+    hit_cols = _matched_cols(index, queries)
+    # Fire if at least one rule symptom matched (partial match); confidence is scaled
+    # by the fraction of rule symptoms matched, for all firing rules at once
+    fired, scores = _score_rules(index, hit_cols) if hit_cols else ([], [])
+
+    for i, score in zip(fired, scores):
+        rule_id, if_syms, cols, then_id, _ = index["entries"][i]
+        if not then_id:
+            continue
+        matched_in_rule = [rs for rs, c in zip(if_syms, cols) if c in hit_cols]
+        rule_confidence = round(score, 2)
 
-        if then_id not in results:
+        entry = results.get(then_id)
+        if entry is None:
+            matched_seen[then_id] = set()
             disease = diseases_by_id.get(then_id, {})
-            results[then_id] = {
-                "disease_id": then_id,
-                "disease_name": disease.get("name", then_id),
-                "confidence": rule_confidence,
-                "fired_rules": [],
-                "matched_symptoms": list(matched_in_rule),
-                "explanation": "",
-            }
-        entry = results[then_id]
-        entry["fired_rules"].append({
-            "rule_id": rule_id,
-            "matched_symptoms": list(matched_in_rule),
-            "rule_confidence": rule_confidence,
-        })
-        if rule_confidence > entry["confidence"]:
-            entry["confidence"] = rule_confidence
-        entry["matched_symptoms"] = list(dict.fromkeys(entry["matched_symptoms"] + matched_in_rule))
+            entry = results[then_id] = MatchResult(then_id, disease.get("name", then_id), rule_confidence)
+        entry.fired_rules.append(FiredRule(rule_id, matched_in_rule, rule_confidence))
+        if rule_confidence > entry.confidence:
+            entry.confidence = rule_confidence
+        seen = matched_seen[then_id]
+        for m in matched_in_rule:
+            if m not in seen:
+                seen.add(m)
+                entry.matched_symptoms.append(m)
+    return list(results.values())
 
-    # Build human-readable explanation for each result
-    for disease_id, entry in results.items():
-        parts = []
-        for fr in entry["fired_rules"]:
-            parts.append(
-                f"Rule '{fr['rule_id']}' fired: symptoms {fr['matched_symptoms']} matched (confidence {fr['rule_confidence']:.0%})."
-            )
-        entry["explanation"] = " ".join(parts) if parts else "No rule explanation available."
 
-    out = list(results.values())
-    out.sort(key=lambda x: (-x["confidence"], -len(x["matched_symptoms"])))
-    return out
+def _finish(results: list[MatchResult]) -> list[MatchResult]:
+    """Add the human-readable explanation to each result and rank them."""
+    for entry in results:
+        entry.explanation = _explain(entry.fired_rules)
+    return sorted(results, key=lambda x: (-x.confidence, -len(x.matched_symptoms)))
+
+
+def _explain(fired_rules) -> str:
+    return " ".join(
+        f"Rule '{fr.rule_id}' fired: symptoms {fr.matched_symptoms} matched (confidence {fr.rule_confidence:.0%})."
+        for fr in fired_rules
+    ) or "No rule explanation available."
+
+
+def _build_diseases_by_id(diseases: list | None) -> dict:
+    """id -> disease record (first record wins on a duplicate id)."""
+    by_id: dict = {}
+    for d in diseases or ():
+        if isinstance(d, dict):
+            by_id.setdefault(d.get("id"), d)
+    return by_id
+
+
+def _diseases_by_id(kb: dict) -> dict:
+    return per_list_cache(kb, "diseases", _build_diseases_by_id)
 
 
 def get_disease_by_id(disease_id: str, kb: dict) -> dict | None:
     """Return full disease record for explanation view."""
-    for d in kb.get("diseases", []):
-        if isinstance(d, dict) and d.get("id") == disease_id:
-            return d
-    return None
+    return _diseases_by_id(kb).get(disease_id)
+
+
+def _build_all_symptoms(facts: list | None, diseases: list | None, rules: list | None) -> list[str]:
+    found = chain(
+        facts or (),
+        chain.from_iterable(d.get("symptoms") or () for d in diseases or () if isinstance(d, dict)),
+        chain.from_iterable(r.get("if_symptoms") or () for r in rules or () if isinstance(r, dict)),
+    )
+    return sorted({t for t in (str(s).strip() for s in found) if t})
 
 
 def get_all_symptoms_from_kb(kb: dict) -> list[str]:
     """Unique sorted symptoms from facts, diseases, and rules for UI dropdowns."""
-    seen = set()
-    for s in (kb.get("facts") or {}).get("symptoms") or []:
-        t = str(s).strip()
-        if t:
-            seen.add(t)
-    for d in kb.get("diseases", []):
-        for s in (d.get("symptoms") or []) if isinstance(d, dict) else []:
-            t = str(s).strip()
-            if t:
-                seen.add(t)
-    for r in kb.get("rules", []):
-        for s in (r.get("if_symptoms") or []) if isinstance(r, dict) else []:
-            t = str(s).strip()
-            if t:
-                seen.add(t)
-    return sorted(seen)
+    return list(per_list_cache(kb, ("facts.symptoms", "diseases", "rules"), _build_all_symptoms))
 
 
 # -----------------------------------------------------------------------------
@@ -4,24 +4,45 @@ Matches user-reported symptoms against the condition knowledge base.
 """
 
 import json
+import math
 import os
 import re
+import sys
+import threading
+from functools import lru_cache
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized condition scoring; pure Python otherwise
+    np = None
+
+from utils.caching import per_list_cache
+from utils.matching import build_substring_index, match_columns, symptoms_match
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+# identify_conditions results kept per condition index, keyed by the normalized query
+RESULT_MEMO_SIZE = 256
+_memo_lock = threading.Lock()
+_NON_WORD_RE = re.compile(r"[^\w]")
 
 
 def _normalize(s: str) -> str:
     """Normalize text for matching: lowercase, strip, collapse spaces."""
     if not s or not isinstance(s, str):
         return ""
-    return " ".join(re.sub(r"[^\w\s]", "", s.lower()).split())
+    return _normalize_str(s)
+
+
+@lru_cache(maxsize=8192)
+def _normalize_str(s: str) -> str:
+    return sys.intern(" ".join(_PUNCT_RE.sub("", s.lower()).split()))
 
 
 def _symptom_matches(user_symptom: str, known_symptom: str) -> bool:
     """Check if user symptom matches known symptom (exact or contains)."""
-    u = _normalize(user_symptom)
-    k = _normalize(known_symptom)
-    if not u or not k:
-        return False
-    return u == k or u in k or k in u
+    return symptoms_match(_normalize(user_symptom), _normalize(known_symptom))
 
 
 def load_knowledge_base(path: str | None = None) -> dict:
@@ -43,36 +64,134 @@ def save_knowledge_base(data: dict, path: str | None = None) -> None:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 
+def build_condition_index(kb: dict) -> dict:
+    """
+    Precompute per-condition data for identify_conditions: stripped known symptoms and
+    their vocabulary columns, a vocabulary of unique normalized symptoms with its substring
+    lookup tables and, with NumPy, flat (condition, column) arrays so every condition's hit
+    count comes from a few array ops.
+    Build once per KB version and pass it in; it does not track later edits to kb.
+    """
+    vocab: dict[str, int] = {}
+    conds = []  # (condition, known, known_cols); -1 for a symptom that normalizes to ""
+    rows, cols = [], []
+    for i, cond in enumerate(kb.get("conditions", [])):
+        known = [str(s).strip() for s in cond.get("symptoms", [])]
+        known_cols = []
+        for ks in known:
+            k = _normalize(ks)
+            col = vocab.setdefault(k, len(vocab)) if k else -1
+            if k:
+                rows.append(i)
+                cols.append(col)
+            known_cols.append(col)
+        conds.append((cond, known, known_cols))
+    arrays = None
+    if np is not None and cols:
+        arrays = {
+            "rows": np.array(rows, dtype=np.int32),
+            "cols": np.array(cols, dtype=np.int32),
+            "n_known": np.fromiter((len(k) for _, k, _ in conds), dtype=np.float64, count=len(conds)),
+        }
+    text = build_substring_index(vocab)
+    return {"vocab": vocab, "conditions": conds, "arrays": arrays, "text": text, "memo": {}}
+
+
+def _first_matches(user_cols: list[set[int]], known: list[str], known_cols: list[int]) -> list[str]:
+    """For each user symptom (its matching vocabulary columns), the first known symptom it matches."""
+    matched = []
+    for hit in user_cols:
+        for ks, col in zip(known, known_cols):
+            if col in hit:
+                matched.append(ks)
+                break
+    return matched
+
+
+def _condition_hits(index: dict, user_cols: list[set[int]]):
+    """Per condition, how many user symptoms match at least one of its known symptoms."""
+    vocab, arrays = index["vocab"], index["arrays"]
+    n_conds = len(index["conditions"])
+    hits = np.zeros(n_conds, dtype=np.int64)
+    for hit in user_cols:
+        if not hit:
+            continue
+        mask = np.zeros(len(vocab), dtype=bool)
+        mask[list(hit)] = True
+        hits += np.bincount(arrays["rows"][mask[arrays["cols"]]], minlength=n_conds) > 0
+    return hits
+
+
 def identify_conditions(
     user_symptoms: list[str],
     kb: dict | None = None,
+    index: dict | None = None,
+    metric: str = "ratio",
 ) -> list[dict]:
     """
     Match user symptoms to conditions in the knowledge base.
     Returns list of matches with score and matched symptoms.
+
+    metric: "ratio" (default) scores 0.6 * share of user symptoms matched + 0.4 * share of
+    condition symptoms covered; "cosine" scores hits / sqrt(user symptoms * condition symptoms),
+    the cosine similarity of the two binary symptom vectors.
+
+    index: optional result of build_condition_index(kb); pass a cached one to skip rebuilding it
+    and to reuse results for queries seen before.
     """
-    if kb is None:
-        kb = load_knowledge_base()
-    conditions = kb.get("conditions", [])
+    if metric not in ("ratio", "cosine"):
+        raise ValueError(f"Unknown metric: {metric!r}")
     user_symptoms = [s.strip() for s in user_symptoms if s and s.strip()]
     if not user_symptoms:
         return []
+    if index is None:
+        if kb is None:
+            kb = load_knowledge_base()
+        index = build_condition_index(kb)
+    conds = index["conditions"]
+
+    # Normalize the query once; known symptoms are already normalized in the index
+    user_norm = [_normalize(us) for us in user_symptoms]
+    # Matches follow the query order and scores its length, so the memo key is the whole tuple
+    memo, memo_key = index["memo"], (metric, tuple(user_norm))
+    with _memo_lock:
+        hit = memo.pop(memo_key, None)
+        if hit is not None:
+            memo[memo_key] = hit  # most recently used goes last
+    if hit is not None:
+        return [{**r, "matched_symptoms": list(r["matched_symptoms"])} for r in hit]
+    # Vocabulary columns each user symptom matches, resolved once for the scores and the matched names
+    user_cols = [match_columns(index["text"], u) for u in user_norm if u]
+    if index["arrays"] is None:
+        candidates, scores = range(len(conds)), None
+    else:
+        # Score: proportion of user symptoms that matched + proportion of condition symptoms covered,
+        # for every condition with a hit at once
+        hits = _condition_hits(index, user_cols)
+        fired = np.flatnonzero(hits)
+        n_hits = hits[fired]
+        candidates = fired.tolist()
+        n_known = index["arrays"]["n_known"][fired]
+        if metric == "cosine":
+            scores = (n_hits / np.sqrt(n_known * len(user_symptoms))).tolist()
+        else:
+            scores = (0.6 * (n_hits / len(user_symptoms)) + 0.4 * (n_hits / n_known)).tolist()
 
     results = []
-    for cond in conditions:
-        known = [str(s).strip() for s in cond.get("symptoms", [])]
-        matched = []
-        for us in user_symptoms:
-            for ks in known:
-                if _symptom_matches(us, ks):
-                    matched.append(ks)
-                    break
+    for pos, i in enumerate(candidates):
+        cond, known, known_cols = conds[i]
+        matched = _first_matches(user_cols, known, known_cols)
         if not matched:
             continue
-        # Score: proportion of user symptoms that matched + proportion of condition symptoms covered
-        user_matched_ratio = len(matched) / len(user_symptoms) if user_symptoms else 0
-        condition_ratio = len(matched) / len(known) if known else 0
-        score = 0.6 * user_matched_ratio + 0.4 * condition_ratio
+        if scores is None and metric == "cosine":
+            score = len(matched) / math.sqrt(len(user_symptoms) * len(known))
+        elif scores is None:
+            # Score: proportion of user symptoms that matched + proportion of condition symptoms covered
+            user_matched_ratio = len(matched) / len(user_symptoms) if user_symptoms else 0
+            condition_ratio = len(matched) / len(known) if known else 0
+            score = 0.6 * user_matched_ratio + 0.4 * condition_ratio
+        else:
+            score = scores[pos]
         results.append({
             "id": cond.get("id", ""),
             "name": cond.get("name", ""),
@@ -83,37 +202,51 @@ def identify_conditions(
         })
 
     results.sort(key=lambda x: (-x["score"], -len(x["matched_symptoms"])))
-    return results
+    with _memo_lock:
+        if len(memo) >= RESULT_MEMO_SIZE:
+            memo.pop(next(iter(memo)))
+        memo[memo_key] = results
+    return [{**r, "matched_symptoms": list(r["matched_symptoms"])} for r in results]
+
+
+def _build_all_symptoms(conditions: list | None) -> list[str]:
+    found = chain.from_iterable(cond.get("symptoms", []) for cond in conditions or ())
+    return sorted({t for t in (str(s).strip() for s in found) if t})
 
 
 def get_all_symptoms(kb: dict | None = None) -> list[str]:
     """Return sorted list of all unique symptoms in the knowledge base."""
     if kb is None:
         kb = load_knowledge_base()
-    seen = set()
-    for cond in kb.get("conditions", []):
-        for s in cond.get("symptoms", []):
-            t = str(s).strip()
-            if t:
-                seen.add(t)
-    return sorted(seen)
+    return list(per_list_cache(kb, "conditions", _build_all_symptoms))
+
+
+def _build_condition_maps(conditions: list | None) -> tuple[dict, dict]:
+    """id -> condition (first wins) and category -> conditions (in list order)."""
+    by_id: dict = {}
+    by_category: dict[str, list[dict]] = {}
+    for c in conditions or ():
+        by_id.setdefault(c.get("id"), c)
+        by_category.setdefault((c.get("category") or "").strip(), []).append(c)
+    return by_id, by_category
+
+
+def _condition_maps_for(kb: dict) -> tuple[dict, dict]:
+    return per_list_cache(kb, "conditions", _build_condition_maps)
 
 
 def get_condition_by_id(condition_id: str, kb: dict | None = None) -> dict | None:
     """Return full condition dict by id, or None."""
     if kb is None:
         kb = load_knowledge_base()
-    for c in kb.get("conditions", []):
-        if c.get("id") == condition_id:
-            return c
-    return None
+    return _condition_maps_for(kb)[0].get(condition_id)
 
 
 def get_conditions_by_category(category: str, kb: dict | None = None) -> list[dict]:
     """Return all conditions in a category."""
     if kb is None:
         kb = load_knowledge_base()
-    return [c for c in kb.get("conditions", []) if (c.get("category") or "").strip() == category]
+    return list(_condition_maps_for(kb)[1].get(category, ()))
 
 
 def add_condition(
@@ -129,7 +262,7 @@ def add_condition(
         kb = load_knowledge_base()
     conditions = kb.get("conditions", [])
     existing_ids = {c.get("id", "") for c in conditions}
-    base_id = re.sub(r"[^\w]", "", name.lower()).replace(" ", "_")[:40]
+    base_id = _NON_WORD_RE.sub("", name.lower()).replace(" ", "_")[:40]
     new_id = base_id
     i = 0
     while new_id in existing_ids or not new_id:
@@ -4,12 +4,34 @@ Loads and validates JSON knowledge base; enforces schema; checks consistency.
 Knowledge (rules and facts) is kept separate from reasoning logic.
 """
 
+import argparse
+import hashlib
 import json
+import mmap
+import multiprocessing
 import os
 import re
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Any
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Container, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON parse/serialize; stdlib json otherwise
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional: streaming validation of large files; full parse otherwise
+    ijson = None
+
+from utils.caching import cached_per_list, per_list_cache, set_per_list_cache
+from utils.formatting import clean_list
 
 # -----------------------------------------------------------------------------
 # Schema and validation (KBS: enforce structure so reasoning is reliable)
@@ -21,12 +43,21 @@ REQUIRED_METADATA_KEYS = {"version", "last_updated"}
 REQUIRED_DISEASE_KEYS = {"id", "name", "description", "symptoms", "diagnostics", "treatment", "references"}
 REQUIRED_RULE_KEYS = {"id", "if_symptoms", "then_disease_id", "confidence"}
 
+# Rule count from which consistency checks normalize the rules in worker processes
+# (below it, starting the workers costs more than it saves)
+PARALLEL_VALIDATE_MIN_RULES = 50000
+
 
 def _normalize_symptom(s: str) -> str:
     """Normalize symptom string for consistent matching."""
     if not s or not isinstance(s, str):
         return ""
-    return " ".join(s.strip().lower().split())
+    return _normalize_symptom_str(s)
+
+
+@lru_cache(maxsize=8192)
+def _normalize_symptom_str(s: str) -> str:
+    return sys.intern(" ".join(s.strip().lower().split()))
 
 
 def validate_schema(kb: dict) -> tuple[bool, list[str]]:
@@ -58,17 +89,7 @@ def validate_schema(kb: dict) -> tuple[bool, list[str]]:
     else:
         disease_ids = set()
         for i, d in enumerate(diseases):
-            if not isinstance(d, dict):
-                errors.append(f"diseases[{i}] must be an object.")
-                continue
-            missing_d = REQUIRED_DISEASE_KEYS - set(d.keys())
-            if missing_d:
-                errors.append(f"diseases[{i}] missing keys: {missing_d}")
-            did = d.get("id")
-            if did in disease_ids:
-                errors.append(f"Duplicate disease id: {did}")
-            if did:
-                disease_ids.add(did)
+            _check_disease(i, d, disease_ids, errors)
 
     # Rules
     rules = kb.get("rules")
@@ -77,64 +98,122 @@ def validate_schema(kb: dict) -> tuple[bool, list[str]]:
     else:
         rule_ids = set()
         for i, r in enumerate(rules):
-            if not isinstance(r, dict):
-                errors.append(f"rules[{i}] must be an object.")
-                continue
-            missing_r = REQUIRED_RULE_KEYS - set(r.keys())
-            if missing_r:
-                errors.append(f"rules[{i}] missing keys: {missing_r}")
-            rid = r.get("id")
-            if rid and rid in rule_ids:
-                errors.append(f"Duplicate rule id: {rid}")
-            if rid:
-                rule_ids.add(rid)
+            _check_rule(i, r, rule_ids, errors)
 
     return len(errors) == 0, errors
 
 
-def check_duplicate_rules(rules: list[dict]) -> list[str]:
-    """Detect rules with identical antecedent and consequent. Returns list of messages."""
-    messages: list[str] = []
-    seen: dict[tuple, str] = {}
+def _check_disease(i: int, d: Any, disease_ids: set, errors: list[str]) -> None:
+    """Schema errors for diseases[i]; records its id in disease_ids."""
+    if not isinstance(d, dict):
+        errors.append(f"diseases[{i}] must be an object.")
+        return
+    missing_d = REQUIRED_DISEASE_KEYS - set(d.keys())
+    if missing_d:
+        errors.append(f"diseases[{i}] missing keys: {missing_d}")
+    did = d.get("id")
+    if did in disease_ids:
+        errors.append(f"Duplicate disease id: {did}")
+    if did:
+        disease_ids.add(did)
+
+
+def _check_rule(i: int, r: Any, rule_ids: set, errors: list[str]) -> None:
+    """Schema errors for rules[i]; records its id in rule_ids."""
+    if not isinstance(r, dict):
+        errors.append(f"rules[{i}] must be an object.")
+        return
+    missing_r = REQUIRED_RULE_KEYS - set(r.keys())
+    if missing_r:
+        errors.append(f"rules[{i}] missing keys: {missing_r}")
+    rid = r.get("id")
+    if rid and rid in rule_ids:
+        errors.append(f"Duplicate rule id: {rid}")
+    if rid:
+        rule_ids.add(rid)
+
+
+def _iter_compact(rules: list) -> Iterator[tuple[str, frozenset[str], Any]]:
     for r in rules:
-        key = (tuple(sorted(_normalize_symptom(s) for s in (r.get("if_symptoms") or []))), r.get("then_disease_id"))
+        if isinstance(r, dict):
+            yield r.get("id", ""), frozenset(_normalize_symptom(s) for s in (r.get("if_symptoms") or [])), r.get("then_disease_id")
+
+
+def compact_rules(rules: list[dict]) -> list[tuple[str, frozenset[str], Any]]:
+    """
+    (id, normalized IF-symptom set, then_disease_id) per rule dict, built in one pass so
+    several checks can share it instead of re-reading and re-normalizing every rule.
+    """
+    return list(_iter_compact(rules))
+
+
+def _compact_for_validation(rules: list) -> Iterable[tuple[str, frozenset[str], Any]]:
+    """
+    Compact rules for _validate_rules. Large rule lists are compacted in worker processes,
+    one contiguous slice per CPU, and concatenated in slice order, so the fused pass over
+    them (and its messages) is the same as the serial one.
+    """
+    workers = os.cpu_count() or 1
+    if len(rules) < PARALLEL_VALIDATE_MIN_RULES or workers < 2:
+        return _iter_compact(rules)
+    size = -(-len(rules) // workers)
+    chunks = [rules[start:start + size] for start in range(0, len(rules), size)]
+    # Spawned, not forked: the app runs threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(chain.from_iterable(pool.map(compact_rules, chunks)))
+
+
+def _validate_rules(compact: Iterable[tuple], disease_ids: set | None) -> tuple[list[str], list[str], list[str]]:
+    """
+    Duplicate, conflict and unknown-disease messages from one pass over compact rules:
+    each rule's canonical antecedent key feeds the duplicate lookup and the per-antecedent
+    conclusions while its consequent is checked against disease_ids (skipped if None).
+    """
+    duplicates: list[str] = []
+    unknown: list[str] = []
+    seen: dict[tuple, str] = {}
+    by_antecedent: dict[frozenset[str], set[str]] = {}
+    for rid, ant, then_id in compact:
+        key = (ant, then_id)
         if key in seen:
-            messages.append(f"Duplicate rule: same IF-THEN as rule '{seen[key]}' (rule '{r.get('id', '')}').")
+            duplicates.append(f"Duplicate rule: same IF-THEN as rule '{seen[key]}' (rule '{rid}').")
         else:
-            seen[key] = r.get("id", "")
-    return messages
+            seen[key] = rid
+        by_antecedent.setdefault(ant, set()).add(then_id if then_id is not None else "")
+        if disease_ids is not None and then_id and then_id not in disease_ids:
+            unknown.append(f"Rule '{rid}' references unknown disease id: {then_id}")
+    conflicts = [
+        f"Conflicting conclusions for same symptom set: {ids}"
+        for ids in by_antecedent.values()
+        if len(ids) > 1
+    ]
+    return duplicates, conflicts, unknown
+
+
+def _disease_ids(kb: dict) -> set:
+    return {d.get("id") for d in kb.get("diseases", []) if isinstance(d, dict) and d.get("id")}
 
 
-def check_conflicting_conclusions(rules: list[dict]) -> list[str]:
+def check_duplicate_rules(rules: list[dict], compact: list[tuple] | None = None) -> list[str]:
+    """Detect rules with identical antecedent and consequent. Returns list of messages."""
+    return _validate_rules(_iter_compact(rules) if compact is None else compact, None)[0]
+
+
+def check_conflicting_conclusions(rules: list[dict], compact: list[tuple] | None = None) -> list[str]:
     """
     Detect rules with same antecedent but different consequent (same symptoms, different disease).
     In KBS this can be intentional (differential) but we flag for review.
     """
-    messages: list[str] = []
-    by_antecedent: dict[str, set[str]] = {}
-    for r in rules:
-        ant = tuple(sorted(_normalize_symptom(s) for s in (r.get("if_symptoms") or [])))
-        tid = r.get("then_disease_id", "")
-        key = str(ant)
-        if key not in by_antecedent:
-            by_antecedent[key] = set()
-        by_antecedent[key].add(tid)
-    for ant, disease_ids in by_antecedent.items():
-        if len(disease_ids) > 1:
-            messages.append(f"Conflicting conclusions for same symptom set: {disease_ids}")
-    return messages
+    return _validate_rules(_iter_compact(rules) if compact is None else compact, None)[1]
 
 
-def validate_rules_reference_diseases(kb: dict) -> list[str]:
+def validate_rules_reference_diseases(kb: dict, compact: list[tuple] | None = None) -> list[str]:
     """Ensure every rule's then_disease_id exists in diseases."""
     messages: list[str] = []
-    disease_ids = {d.get("id") for d in kb.get("diseases", []) if isinstance(d, dict) and d.get("id")}
-    for r in kb.get("rules", []):
-        if not isinstance(r, dict):
-            continue
-        tid = r.get("then_disease_id")
+    disease_ids = _disease_ids(kb)
+    for rid, _, tid in _iter_compact(kb.get("rules", [])) if compact is None else compact:
         if tid and tid not in disease_ids:
-            messages.append(f"Rule '{r.get('id', '')}' references unknown disease id: {tid}")
+            messages.append(f"Rule '{rid}' references unknown disease id: {tid}")
     return messages
 
 
@@ -147,6 +226,9 @@ _load_time: datetime | None = None
 _validation_status: str = "not_loaded"
 _validation_errors: list[str] = []
 
+# abspath -> ((st_mtime_ns, st_size), kb, validation status, errors, load time); an edited file misses
+_kb_cache: dict[str, tuple[tuple[int, int], dict, str, list[str], datetime | None]] = {}
+
 
 def get_data_path(filename: str = "knowledge_base.json") -> str:
     """Path to knowledge JSON under data/."""
@@ -154,20 +236,75 @@ def get_data_path(filename: str = "knowledge_base.json") -> str:
     return os.path.join(base, "data", filename)
 
 
+def loads_json(raw: bytes | memoryview) -> Any:
+    """Parse UTF-8 JSON bytes (orjson when installed; its decode errors subclass json.JSONDecodeError)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(str(raw, "utf-8"))
+
+
+@contextmanager
+def _mapped(path: str):
+    """Read-only view of a file's bytes through mmap, so parsing skips the copy into a bytes object."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:  # mmap rejects empty files
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            yield view
+
+
+def read_json(path: str) -> Any:
+    """Parse a JSON file."""
+    with _mapped(path) as buf:
+        return loads_json(buf)
+
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Write data as UTF-8 JSON with 2-space indent (orjson when installed). The file is
+    written under a temporary name and swapped in, so a crash or a concurrent reader
+    never sees it half-written.
+    """
+    tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        if orjson is not None:
+            with open(tmp, "wb") as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
 def load_knowledge(filepath: str | None = None, use_cache: bool = True) -> dict:
     """
     Load knowledge base from JSON. Validates schema and consistency.
-    Caches result for performance (1000+ rules). Returns validated kb dict.
+    Caches result per file, keyed by modification time and size, so an unchanged
+    file is never re-parsed and an edited one always is. Validation results for the
+    exact file content are reused from its .validated record. Returns validated kb dict.
     """
     global _loaded_kb, _load_time, _validation_status, _validation_errors
-    path = filepath or get_data_path()
-
-    if use_cache and _loaded_kb is not None and path == get_data_path():
-        return _loaded_kb
+    path = os.path.abspath(filepath or get_data_path())
 
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            kb = json.load(f)
+        stat = os.stat(path)
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        cached = _kb_cache.get(path)
+        if use_cache and cached is not None and cached[0] == file_key:
+            _, _loaded_kb, _validation_status, errors, _load_time = cached
+            _validation_errors = list(errors)
+            return _loaded_kb
+        with _mapped(path) as buf:
+            kb = loads_json(buf)
+            digest = hashlib.blake2b(buf, digest_size=16).hexdigest()
+        intern_symptoms(kb)
     except FileNotFoundError:
         _validation_status = "error"
         _validation_errors = [f"File not found: {path}"]
@@ -177,17 +314,80 @@ def load_knowledge(filepath: str | None = None, use_cache: bool = True) -> dict:
         _validation_errors = [f"Invalid JSON: {e}"]
         raise
 
-    ok, schema_errors = validate_schema(kb)
-    if not ok:
-        _validation_status = "invalid_schema"
-        _validation_errors = schema_errors
-        raise ValueError("Knowledge base schema invalid: " + "; ".join(schema_errors[:5]))
-
-    rules = kb.get("rules", [])
-    dup = check_duplicate_rules(rules)
-    conflict = check_conflicting_conclusions(rules)
-    refs = validate_rules_reference_diseases(kb)
-    all_errors = dup + conflict + refs
+    recorded = _read_validation(path, digest)
+    if recorded is not None:
+        _validation_status, _validation_errors = recorded
+        _loaded_kb = kb
+        _load_time = datetime.utcnow()
+    else:
+        ok, schema_errors = validate_schema(kb)
+        if not ok:
+            _validation_status = "invalid_schema"
+            _validation_errors = schema_errors
+            raise ValueError("Knowledge base schema invalid: " + "; ".join(schema_errors[:5]))
+        _record_loaded(kb)
+        _write_validation(path, digest, _validation_status, _validation_errors)
+
+    _kb_cache[path] = (file_key, kb, _validation_status, list(_validation_errors), _load_time)
+    return kb
+
+
+# Validation results are recorded next to the KB file ("<file>.validated") with a hash of
+# its bytes, so a restart with an unchanged file skips validation. Bump the version when
+# a validator changes, so results recorded by older code are ignored.
+VALIDATION_VERSION = 1
+
+
+def _validation_path(path: str) -> str:
+    return path + ".validated"
+
+
+def _read_validation(path: str, digest: str) -> tuple[str, list[str]] | None:
+    """(status, errors) recorded for this exact file content, or None."""
+    try:
+        rec = read_json(_validation_path(path))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(rec, dict) or rec.get("version") != VALIDATION_VERSION or rec.get("hash") != digest:
+        return None
+    status, errors = rec.get("status"), rec.get("errors")
+    if status not in ("valid", "consistency_warnings") or not isinstance(errors, list):
+        return None
+    return status, [str(e) for e in errors]
+
+
+def _write_validation(path: str, digest: str, status: str, errors: list[str]) -> None:
+    try:
+        write_json(_validation_path(path), {"version": VALIDATION_VERSION, "hash": digest, "status": status, "errors": errors})
+    except OSError:
+        pass  # e.g. read-only data dir: validate again on the next cold load
+
+
+def intern_symptoms(kb: dict) -> None:
+    """
+    Replace the symptom strings in facts, diseases and rules with interned copies, in
+    place, so the kb holds one object per distinct symptom (a freshly parsed kb has one
+    per occurrence) and equal symptoms compare by identity.
+    """
+    facts = kb.get("facts")
+    lists = [facts.get("symptoms")] if isinstance(facts, dict) else []
+    lists += [d.get("symptoms") for d in kb.get("diseases") or [] if isinstance(d, dict)]
+    lists += [r.get("if_symptoms") for r in kb.get("rules") or [] if isinstance(r, dict)]
+    for items in lists:
+        if isinstance(items, list):
+            items[:] = [sys.intern(s) if type(s) is str else s for s in items]
+
+
+def _consistency_errors(kb: dict) -> list[str]:
+    """Duplicate rules, conflicting conclusions and unknown disease references."""
+    duplicates, conflicts, unknown = _validate_rules(_compact_for_validation(kb.get("rules", [])), _disease_ids(kb))
+    return duplicates + conflicts + unknown
+
+
+def _record_loaded(kb: dict) -> None:
+    """Cache a schema-valid kb as the loaded knowledge and record its consistency status."""
+    global _loaded_kb, _load_time, _validation_status, _validation_errors
+    all_errors = _consistency_errors(kb)
     if all_errors:
         _validation_status = "consistency_warnings"
         _validation_errors = all_errors
@@ -197,7 +397,6 @@ def load_knowledge(filepath: str | None = None, use_cache: bool = True) -> dict:
 
     _loaded_kb = kb
     _load_time = datetime.utcnow()
-    return kb
 
 
 def get_load_info() -> dict[str, Any]:
@@ -214,6 +413,7 @@ def get_load_info() -> dict[str, Any]:
 def clear_cache() -> None:
     """Clear cached knowledge (e.g. after file replace for maintenance)."""
     global _loaded_kb, _load_time, _validation_status, _validation_errors
+    _kb_cache.clear()
     _loaded_kb = None
     _load_time = None
     _validation_status = "not_loaded"
@@ -226,17 +426,86 @@ def clear_cache() -> None:
 
 
 def save_knowledge_base(kb: dict, filepath: str | None = None) -> None:
-    """Write knowledge base to JSON. Clears cache so next load is fresh."""
-    path = filepath or get_data_path()
+    """
+    Write knowledge base to JSON (atomically, see write_json). The saved kb replaces that
+    file's cache entry in place (validated in memory, no re-parse), and for the default path
+    becomes the loaded knowledge. An invalid kb is not cached: the next load reports it.
+    """
+    global _loaded_kb, _load_time, _validation_status, _validation_errors
+    path = os.path.abspath(filepath or get_data_path())
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(kb, f, indent=2, ensure_ascii=False)
-    clear_cache()
+    write_json(path, kb)
+    try:
+        os.remove(_validation_path(path))
+    except FileNotFoundError:
+        pass
+    stat = os.stat(path)
+    file_key = (stat.st_mtime_ns, stat.st_size)
+    is_default = path == os.path.abspath(get_data_path())
+    if not validate_schema(kb)[0]:
+        _kb_cache.pop(path, None)
+        if is_default:
+            _loaded_kb, _load_time, _validation_status, _validation_errors = None, None, "not_loaded", []
+    elif is_default:
+        _record_loaded(kb)
+        _kb_cache[path] = (file_key, kb, _validation_status, list(_validation_errors), _load_time)
+    else:
+        errors = _consistency_errors(kb)
+        status = "consistency_warnings" if errors else "valid"
+        _kb_cache[path] = (file_key, kb, status, errors, datetime.utcnow())
+
+
+def _build_id_positions(items: list | None) -> dict[Any, list[int]]:
+    """id -> positions of the records with that id."""
+    positions: dict[Any, list[int]] = {}
+    for i, item in enumerate(items or ()):
+        if isinstance(item, dict):
+            positions.setdefault(item.get("id"), []).append(i)
+    return positions
+
+
+def _id_positions(kb: dict, key: str) -> dict[Any, list[int]]:
+    """Id positions in kb["diseases"] or kb["rules"], cached per list; every mutator below replaces the list."""
+    return per_list_cache(kb, key, _build_id_positions)
+
+
+def _append_record(kb: dict, key: str, record: dict) -> None:
+    """
+    Set kb[key] to a new list with record appended. Cached id positions for the old list
+    carry over to the new one (plus the record), so the next lookup does not rebuild them.
+    """
+    items = kb.get(key) or []
+    positions = cached_per_list(kb, key, _build_id_positions)
+    kb[key] = [*items, record]
+    if positions is not None:
+        positions.setdefault(record.get("id"), []).append(len(items))
+        set_per_list_cache(kb, key, _build_id_positions, positions)
+
+
+def _replace_by_id(kb: dict, key: str, record_id: str, new: dict | None) -> None:
+    """Set kb[key] to a new list with every record of that id replaced by new (or dropped if None)."""
+    hits = _id_positions(kb, key).get(record_id) or []
+    items = list(kb.get(key, []))
+    if new is None:
+        drop = set(hits)
+        items = [item for i, item in enumerate(items) if i not in drop] if drop else items
+    else:
+        for i in hits:
+            items[i] = new
+    kb[key] = items
 
 
-def _make_disease_id(name: str, existing_ids: set[str]) -> str:
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def _stripped(items: Iterable) -> Iterator[str]:
+    """str(s).strip() of every entry, empty ones included."""
+    return map(str.strip, map(str, items))
+
+
+def _make_disease_id(name: str, existing_ids: Container) -> str:
     """Generate unique disease id from name."""
-    base = re.sub(r"[^\w\s]", "", name.lower()).replace(" ", "_")[:40] or "disease"
+    base = _PUNCT_RE.sub("", name.lower()).replace(" ", "_")[:40] or "disease"
     out = base
     i = 0
     while out in existing_ids or not out:
@@ -255,13 +524,11 @@ def add_disease(
     references: str = "",
 ) -> dict:
     """Append a new disease. Returns updated kb (call save_knowledge_base after)."""
-    diseases = list(kb.get("diseases", []))
-    existing_ids = {d.get("id", "") for d in diseases if isinstance(d, dict)}
-    new_id = _make_disease_id(name.strip(), existing_ids)
-    symptoms_clean = [s.strip() for s in symptoms if s and str(s).strip()]
-    diagnostics_clean = [s.strip() for s in diagnostics if s and str(s).strip()]
-    treatment_clean = [s.strip() for s in treatment if s and str(s).strip()]
-    diseases.append({
+    new_id = _make_disease_id(name.strip(), _id_positions(kb, "diseases"))
+    symptoms_clean = clean_list(symptoms)
+    diagnostics_clean = clean_list(diagnostics)
+    treatment_clean = clean_list(treatment)
+    _append_record(kb, "diseases", {
         "id": new_id,
         "name": name.strip(),
         "description": (description or "").strip(),
@@ -270,7 +537,6 @@ def add_disease(
         "treatment": treatment_clean,
         "references": (references or "").strip(),
     })
-    kb["diseases"] = diseases
     return kb
 
 
@@ -285,27 +551,21 @@ def update_disease(
     references: str = "",
 ) -> dict:
     """Update an existing disease by id. Returns updated kb."""
-    diseases = []
-    for d in kb.get("diseases", []):
-        if isinstance(d, dict) and d.get("id") == disease_id:
-            diseases.append({
-                "id": disease_id,
-                "name": name.strip(),
-                "description": (description or "").strip(),
-                "symptoms": [s.strip() for s in symptoms if s and str(s).strip()],
-                "diagnostics": [s.strip() for s in diagnostics if s and str(s).strip()],
-                "treatment": [s.strip() for s in treatment if s and str(s).strip()],
-                "references": (references or "").strip(),
-            })
-        else:
-            diseases.append(d)
-    kb["diseases"] = diseases
+    _replace_by_id(kb, "diseases", disease_id, {
+        "id": disease_id,
+        "name": name.strip(),
+        "description": (description or "").strip(),
+        "symptoms": clean_list(symptoms),
+        "diagnostics": clean_list(diagnostics),
+        "treatment": clean_list(treatment),
+        "references": (references or "").strip(),
+    })
     return kb
 
 
 def delete_disease(kb: dict, disease_id: str) -> dict:
     """Remove a disease by id. Returns updated kb. Rules pointing to it will need manual update."""
-    kb["diseases"] = [d for d in kb.get("diseases", []) if not (isinstance(d, dict) and d.get("id") == disease_id)]
+    _replace_by_id(kb, "diseases", disease_id, None)
     return kb
 
 
@@ -313,17 +573,15 @@ def get_disease_by_id(disease_id: str, kb: dict | None = None) -> dict | None:
     """Return disease dict by id (for Manage form)."""
     if kb is None:
         kb = load_knowledge(use_cache=True)
-    for d in kb.get("diseases", []):
-        if isinstance(d, dict) and d.get("id") == disease_id:
-            return d
-    return None
+    hits = _id_positions(kb, "diseases").get(disease_id)
+    return kb["diseases"][hits[0]] if hits else None
 
 
 # -----------------------------------------------------------------------------
 # Rule management (for Manage Rules UI)
 # -----------------------------------------------------------------------------
 
-def _make_rule_id(existing_ids: set[str], prefix: str = "R") -> str:
+def _make_rule_id(existing_ids: Container, prefix: str = "R") -> str:
     """Generate unique rule id (R1, R2, ... or prefix_N)."""
     i = 1
     while f"{prefix}{i}" in existing_ids:
@@ -331,6 +589,25 @@ def _make_rule_id(existing_ids: set[str], prefix: str = "R") -> str:
     return f"{prefix}{i}"
 
 
+_RULE_NUMBER_RE = re.compile(r"R(\d+)")
+
+
+@lru_cache(maxsize=8192)
+def _rule_number(rule_id: str) -> int:
+    """n for a rule id "R<n>", else 0 (memoized: the same ids are read on every add)."""
+    m = _RULE_NUMBER_RE.fullmatch(rule_id)
+    return int(m.group(1)) if m else 0
+
+
+def next_rule_id(kb: dict) -> str:
+    """
+    The id add_rule assigns when none is given: R<n+1> for the highest R<n> rule id (ids of
+    deleted rules are not reused), read from the cached id index.
+    """
+    top = max((_rule_number(rid) for rid in _id_positions(kb, "rules") if isinstance(rid, str)), default=0)
+    return f"R{top + 1}"
+
+
 def add_rule(
     kb: dict,
     rule_id: str,
@@ -339,19 +616,17 @@ def add_rule(
     confidence: float,
 ) -> dict:
     """Append a new rule. Returns updated kb."""
-    rules = list(kb.get("rules", []))
-    existing = {r.get("id", "") for r in rules if isinstance(r, dict)}
-    rid = (rule_id or "").strip() or _make_rule_id(existing)
+    rid = (rule_id or "").strip() or next_rule_id(kb)
+    existing = _id_positions(kb, "rules")
     if rid in existing:
         rid = _make_rule_id(existing, prefix=rid + "_")
-    symptoms_clean = [s.strip() for s in if_symptoms if s and str(s).strip()]
-    rules.append({
+    symptoms_clean = clean_list(if_symptoms)
+    _append_record(kb, "rules", {
         "id": rid,
         "if_symptoms": symptoms_clean,
         "then_disease_id": (then_disease_id or "").strip(),
         "confidence": max(0.0, min(1.0, float(confidence))),
     })
-    kb["rules"] = rules
     return kb
 
 
@@ -363,24 +638,18 @@ def update_rule(
     confidence: float,
 ) -> dict:
     """Update an existing rule by id. Returns updated kb."""
-    rules = []
-    for r in kb.get("rules", []):
-        if isinstance(r, dict) and r.get("id") == rule_id:
-            rules.append({
-                "id": rule_id,
-                "if_symptoms": [s.strip() for s in if_symptoms if s and str(s).strip()],
-                "then_disease_id": (then_disease_id or "").strip(),
-                "confidence": max(0.0, min(1.0, float(confidence))),
-            })
-        else:
-            rules.append(r)
-    kb["rules"] = rules
+    _replace_by_id(kb, "rules", rule_id, {
+        "id": rule_id,
+        "if_symptoms": clean_list(if_symptoms),
+        "then_disease_id": (then_disease_id or "").strip(),
+        "confidence": max(0.0, min(1.0, float(confidence))),
+    })
     return kb
 
 
 def delete_rule(kb: dict, rule_id: str) -> dict:
     """Remove a rule by id. Returns updated kb."""
-    kb["rules"] = [r for r in kb.get("rules", []) if not (isinstance(r, dict) and r.get("id") == rule_id)]
+    _replace_by_id(kb, "rules", rule_id, None)
     return kb
 
 
@@ -388,10 +657,8 @@ def get_rule_by_id(rule_id: str, kb: dict | None = None) -> dict | None:
     """Return rule dict by id (for Manage form)."""
     if kb is None:
         kb = load_knowledge(use_cache=True)
-    for r in kb.get("rules", []):
-        if isinstance(r, dict) and r.get("id") == rule_id:
-            return r
-    return None
+    hits = _id_positions(kb, "rules").get(rule_id)
+    return kb["rules"][hits[0]] if hits else None
 
 
 # -----------------------------------------------------------------------------
@@ -418,22 +685,31 @@ def get_symptoms_list(kb: dict) -> list[str]:
     out: list[str] = []
     for s in symptoms:
         t = str(s).strip() if s else ""
-        if t and _normalize_symptom(t) not in seen:
-            seen.add(_normalize_symptom(t))
+        norm = _normalize_symptom(t)
+        if t and norm not in seen:
+            seen.add(norm)
             out.append(t)
     return sorted(out)
 
 
+def _build_facts_norm(facts: list | None) -> set[str]:
+    """Normalized facts.symptoms, so add_symptom tests presence without re-normalizing the list."""
+    return {_normalize_symptom(s) for s in facts or () if s}
+
+
 def add_symptom(kb: dict, name: str) -> dict:
     """Add a symptom to facts.symptoms if not already present (normalized). Returns updated kb."""
     _ensure_facts_symptoms(kb)
     n = (name or "").strip()
     if not n:
         return kb
-    existing_norm = {_normalize_symptom(s) for s in kb["facts"]["symptoms"] if s}
-    if _normalize_symptom(n) in existing_norm:
+    existing_norm = per_list_cache(kb, "facts.symptoms", _build_facts_norm)
+    n_norm = _normalize_symptom(n)
+    if n_norm in existing_norm:
         return kb
     kb["facts"]["symptoms"].append(n)
+    existing_norm.add(n_norm)  # keep the cached set in step with the appended list
+    set_per_list_cache(kb, "facts.symptoms", _build_facts_norm, existing_norm)
     return kb
 
 
@@ -449,23 +725,23 @@ def update_symptom(kb: dict, old_name: str, new_name: str) -> dict:
 
     # facts.symptoms
     syms = kb["facts"]["symptoms"]
-    kb["facts"]["symptoms"] = [new_n if _normalize_symptom(str(s).strip()) == old_norm else str(s).strip() for s in syms if str(s).strip()]
+    kb["facts"]["symptoms"] = [new_n if _normalize_symptom(t) == old_norm else t for t in _stripped(syms) if t]
 
-    # diseases
+    # diseases (new list, like the rules below)
+    diseases = []
     for d in kb.get("diseases", []):
-        if not isinstance(d, dict):
-            continue
-        s_list = d.get("symptoms")
-        if isinstance(s_list, list):
-            d["symptoms"] = [new_n if _normalize_symptom(str(s).strip()) == old_norm else str(s).strip() for s in s_list if str(s).strip()]
+        if isinstance(d, dict) and isinstance(d.get("symptoms"), list):
+            d = {**d, "symptoms": [new_n if _normalize_symptom(t) == old_norm else t for t in _stripped(d["symptoms"]) if t]}
+        diseases.append(d)
+    kb["diseases"] = diseases
 
-    # rules
+    # rules (rebuilt as a new list, like add_rule/update_rule, so the old list is never mutated)
+    rules = []
     for r in kb.get("rules", []):
-        if not isinstance(r, dict):
-            continue
-        s_list = r.get("if_symptoms")
-        if isinstance(s_list, list):
-            r["if_symptoms"] = [new_n if _normalize_symptom(str(s).strip()) == old_norm else str(s).strip() for s in s_list if str(s).strip()]
+        if isinstance(r, dict) and isinstance(r.get("if_symptoms"), list):
+            r = {**r, "if_symptoms": [new_n if _normalize_symptom(t) == old_norm else t for t in _stripped(r["if_symptoms"]) if t]}
+        rules.append(r)
+    kb["rules"] = rules
 
     return kb
 
@@ -479,22 +755,172 @@ def delete_symptom(kb: dict, name: str) -> dict:
     old_norm = _normalize_symptom(n)
 
     # facts.symptoms
-    kb["facts"]["symptoms"] = [str(s).strip() for s in kb["facts"]["symptoms"] if _normalize_symptom(str(s).strip()) != old_norm]
+    kb["facts"]["symptoms"] = [t for t in _stripped(kb["facts"]["symptoms"]) if _normalize_symptom(t) != old_norm]
 
-    # diseases: remove from list
+    # diseases: remove from symptoms (new list, as in update_symptom)
+    diseases = []
     for d in kb.get("diseases", []):
-        if not isinstance(d, dict):
-            continue
-        s_list = d.get("symptoms")
-        if isinstance(s_list, list):
-            d["symptoms"] = [str(s).strip() for s in s_list if _normalize_symptom(str(s).strip()) != old_norm]
+        if isinstance(d, dict) and isinstance(d.get("symptoms"), list):
+            d = {**d, "symptoms": [t for t in _stripped(d["symptoms"]) if _normalize_symptom(t) != old_norm]}
+        diseases.append(d)
+    kb["diseases"] = diseases
 
-    # rules: remove from if_symptoms
+    # rules: remove from if_symptoms (new list, as in update_symptom)
+    rules = []
     for r in kb.get("rules", []):
-        if not isinstance(r, dict):
-            continue
-        s_list = r.get("if_symptoms")
-        if isinstance(s_list, list):
-            r["if_symptoms"] = [str(s).strip() for s in s_list if _normalize_symptom(str(s).strip()) != old_norm]
+        if isinstance(r, dict) and isinstance(r.get("if_symptoms"), list):
+            r = {**r, "if_symptoms": [t for t in _stripped(r["if_symptoms"]) if _normalize_symptom(t) != old_norm]}
+        rules.append(r)
+    kb["rules"] = rules
 
     return kb
+
+
+# -----------------------------------------------------------------------------
+# Streaming validation (CI checks: python knowledge_loader.py --validate [FILE])
+# -----------------------------------------------------------------------------
+
+# ijson prefix of each record streamed into validation -> its section
+_STREAMED = {"metadata": "metadata", "diseases.item": "diseases", "rules.item": "rules"}
+
+
+def _stream_records(f) -> Iterator[tuple[str, Any]]:
+    """
+    (section, value) pairs from a knowledge file in one ijson pass: ("key", name) per top-level
+    key, ("array", name) when diseases/rules open as an array, ("metadata", obj), and one
+    ("diseases", d) / ("rules", r) per item. Only one record is built in memory at a time.
+    """
+    builder = start = section = None
+    for prefix, event, value in ijson.parse(f):
+        if builder is None:
+            if prefix == "":
+                if event == "map_key":
+                    yield "key", value
+                elif event not in ("start_map", "end_map"):
+                    yield "not_object", None
+                    return
+                continue
+            if event == "start_array" and prefix in ("diseases", "rules"):
+                yield "array", prefix
+                continue
+            section = _STREAMED.get(prefix)
+            if section is None:
+                continue
+            builder, start = ijson.common.ObjectBuilder(), prefix
+        builder.event(event, value)
+        # A record ends with the closing event (or the single scalar event) at its own prefix
+        if prefix == start and event not in ("start_map", "start_array", "map_key"):
+            yield section, builder.value
+            builder = None
+
+
+def validate_file_streaming(filepath: str | None = None) -> tuple[str, list[str]]:
+    """
+    Validate a knowledge file as load_knowledge would, without building the whole kb:
+    with ijson installed, diseases and rules are parsed and checked one at a time (without
+    it the file is parsed whole). Returns (status, errors); status is "valid",
+    "consistency_warnings", "invalid_schema" or "error". Records nothing and caches nothing.
+    """
+    path = os.path.abspath(filepath or get_data_path())
+    if ijson is None:
+        try:
+            kb = read_json(path)
+        except FileNotFoundError:
+            return "error", [f"File not found: {path}"]
+        except json.JSONDecodeError as e:
+            return "error", [f"Invalid JSON: {e}"]
+        ok, errors = validate_schema(kb)
+        if not ok:
+            return "invalid_schema", errors
+        errors = _consistency_errors(kb)
+        return ("consistency_warnings" if errors else "valid"), errors
+
+    keys: set[str] = set()
+    arrays: set[str] = set()
+    meta_errors: list[str] = ["metadata must be an object with version and last_updated."]
+    disease_errors: list[str] = []
+    rule_errors: list[str] = []
+    disease_ids: set = set()
+    rule_ids: set = set()
+    references: list[tuple[str, Any]] = []
+    counts = {"diseases": 0, "rules": 0}
+    not_object = False
+
+    def rules_compact() -> Iterator[tuple[str, frozenset[str], Any]]:
+        # Schema checks ride along; the rules feed the duplicate/conflict checks as they stream
+        nonlocal not_object, meta_errors
+        for section, value in _stream_records(f):
+            if section == "key":
+                keys.add(value)
+            elif section == "array":
+                arrays.add(value)
+            elif section == "not_object":
+                not_object = True
+            elif section == "metadata":
+                meta_errors = []
+                if isinstance(value, dict):
+                    missing_meta = REQUIRED_METADATA_KEYS - set(value.keys())
+                    if missing_meta:
+                        meta_errors.append(f"metadata missing keys: {missing_meta}")
+                else:
+                    meta_errors.append("metadata must be an object with version and last_updated.")
+            elif section == "diseases":
+                _check_disease(counts["diseases"], value, disease_ids, disease_errors)
+                counts["diseases"] += 1
+            else:
+                _check_rule(counts["rules"], value, rule_ids, rule_errors)
+                counts["rules"] += 1
+                if isinstance(value, dict):
+                    compact = next(_iter_compact([value]))
+                    references.append((compact[0], compact[2]))
+                    yield compact
+
+    try:
+        with open(path, "rb") as f:
+            duplicates, conflicts, _ = _validate_rules(rules_compact(), None)
+    except FileNotFoundError:
+        return "error", [f"File not found: {path}"]
+    except ijson.JSONError as e:
+        return "error", [f"Invalid JSON: {e}"]
+
+    if not_object:
+        return "invalid_schema", ["Knowledge base must be a JSON object."]
+    errors: list[str] = []
+    missing = REQUIRED_TOP_KEYS - keys
+    if missing:
+        errors.append(f"Missing top-level keys: {missing}")
+    errors += meta_errors
+    errors += disease_errors if "diseases" in arrays else ["diseases must be an array."]
+    errors += rule_errors if "rules" in arrays else ["rules must be an array."]
+    if errors:
+        return "invalid_schema", errors
+    # Rule references can only be checked once every disease id has been seen
+    unknown = [
+        f"Rule '{rid}' references unknown disease id: {then_id}"
+        for rid, then_id in references
+        if then_id and then_id not in disease_ids
+    ]
+    errors = duplicates + conflicts + unknown
+    return ("consistency_warnings" if errors else "valid"), errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Knowledge base maintenance.")
+    parser.add_argument(
+        "--validate", nargs="?", const="", metavar="FILE",
+        help="validate a knowledge file (default: data/knowledge_base.json) and exit non-zero if it is invalid",
+    )
+    args = parser.parse_args(argv)
+    if args.validate is None:
+        parser.print_help()
+        return 2
+    path = os.path.abspath(args.validate or get_data_path())
+    status, errors = validate_file_streaming(path)
+    print(f"{path}: {status}")
+    for e in errors:
+        print(f"  - {e}")
+    return 0 if status in ("valid", "consistency_warnings") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,38 +3,68 @@ Knowledge service: load/save medical knowledge base, search, clinical decision s
 and disease management (add, edit, delete).
 """
 
-import json
-import re
 import os
+import re
+import time
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized condition scoring; pure Python otherwise
+    np = None
+
+# Normalize symptom strings for matching (e.g. "Runny nose" vs "runny nose"); clean form input lists.
+from utils.formatting import clean_list, normalize_symptom_text
+# Per-kb caches of derived lookup data (shared with the engines and the loader).
+from utils.caching import per_list_cache
+# Substring matching of normalized symptoms (shared with the engines).
+from utils.matching import build_substring_index, match_columns, symptoms_match
+# Shared JSON I/O: mmap + orjson parsing when available, atomic writes.
+from knowledge_loader import intern_symptoms, read_json, write_json
+
 
-# Normalize symptom strings for matching (e.g. "Runny nose" vs "runny nose").
-from utils.formatting import normalize_symptom_text
+# Parsed knowledge files by absolute path: ((mtime_ns, size), loaded_at, kb). An entry is
+# reused while the file is unchanged and younger than KB_CACHE_TTL seconds (the TTL covers
+# edits a coarse mtime would miss).
+KB_CACHE_TTL = 300.0
+_kb_cache: dict[str, tuple[tuple[int, int], float, dict]] = {}
 
 
+@lru_cache(maxsize=None)
 def _data_path(filename: str = "medical_knowledge.json") -> str:
     """Resolve path to data file relative to project root (where app.py lives)."""
     base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base, "data", filename)
 
 
+def _cached_kb(filepath: str | None = None) -> dict:
+    """The cached parse of the file, shared: for the read-only lookups in this module."""
+    path = os.path.abspath(filepath or _data_path())
+    stat = os.stat(path)
+    file_key = (stat.st_mtime_ns, stat.st_size)
+    hit = _kb_cache.get(path)
+    if hit is not None and hit[0] == file_key and time.monotonic() - hit[1] < KB_CACHE_TTL:
+        return hit[2]
+    kb = read_json(path)
+    intern_symptoms(kb)
+    _kb_cache[path] = (file_key, time.monotonic(), kb)
+    return kb
+
+
 def load_knowledge_base(filepath: str | None = None) -> dict:
     """
     Load the medical knowledge base from JSON.
     Returns dict with key "diseases" (list of disease objects).
     Raises FileNotFoundError or json.JSONDecodeError on failure.
+    Unchanged files are served from cache; the returned dict is a copy of the cached
+    top level, so add/update/delete_disease on it never reach the cache.
     """
-    path = filepath or _data_path()
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return dict(_cached_kb(filepath))
 
 
 def _symptom_matches(user_symptom: str, known_symptom: str) -> bool:
     """True if normalized user input matches or is contained in known symptom (or vice versa)."""
-    u = normalize_symptom_text(user_symptom)
-    k = normalize_symptom_text(known_symptom)
-    if not u or not k:
-        return False
-    return u == k or u in k or k in u
+    return symptoms_match(normalize_symptom_text(user_symptom), normalize_symptom_text(known_symptom))
 
 
 def search_diseases_by_name(query: str, kb: dict | None = None) -> list[dict]:
@@ -45,7 +75,7 @@ def search_diseases_by_name(query: str, kb: dict | None = None) -> list[dict]:
     if not query or not query.strip():
         return []
     if kb is None:
-        kb = load_knowledge_base()
+        kb = _cached_kb()
     q = query.strip().lower()
     return [d for d in kb.get("diseases", []) if q in (d.get("name") or "").lower()]
 
@@ -58,45 +88,123 @@ def search_diseases_by_symptom(symptom: str, kb: dict | None = None) -> list[dic
     if not symptom or not symptom.strip():
         return []
     if kb is None:
-        kb = load_knowledge_base()
-    return [
-        d for d in kb.get("diseases", [])
-        if any(_symptom_matches(symptom, s) for s in (d.get("symptoms") or []))
-    ]
+        kb = _cached_kb()
+    index = _match_index(kb)
+    candidates = set()
+    for k in _matching_known(index, normalize_symptom_text(symptom)):
+        candidates.update(index["postings"][k])
+    return [index["rows"][i][0] for i in sorted(candidates)]
+
+
+# Per-kb matching data for symptom search and get_possible_conditions_for_symptoms: each
+# disease with its stripped and normalized symptoms, and an inverted index from each
+# normalized symptom to the positions of the diseases listing it (with NumPy, also as
+# arrays, with each disease's symptom count, for vectorized scoring), the substring
+# search structures for _matching_known and each disease by id. Cached per kb["diseases"]
+# list (add/update/delete_disease replace it).
+def _build_match_index(diseases: list | None) -> dict:
+    rows = []
+    postings: dict[str, list[int]] = {}
+    for i, d in enumerate(diseases or ()):
+        known = [str(s).strip() for s in d.get("symptoms") or []]
+        known_norm = [normalize_symptom_text(ks) for ks in known]
+        for k in dict.fromkeys(known_norm):
+            if k:
+                postings.setdefault(k, []).append(i)
+        rows.append((d, known, known_norm))
+    arrays = None
+    if np is not None and postings:
+        arrays = {
+            "postings": {k: np.array(p, dtype=np.int32) for k, p in postings.items()},
+            "n_known": np.fromiter((len(known) for _, known, _ in rows), dtype=np.float64, count=len(rows)),
+        }
+    # Substring lookup tables over the known symptoms, column i being keys[i]
+    keys = list(postings)
+    text = build_substring_index({k: i for i, k in enumerate(keys)})
+    by_id: dict = {}
+    for d, _, _ in rows:
+        by_id.setdefault(d.get("id"), d)  # first wins, as a scan would
+    return {"rows": rows, "postings": postings, "arrays": arrays, "keys": keys, "text": text, "by_id": by_id}
+
+
+def _match_index(kb: dict) -> dict:
+    return per_list_cache(kb, "diseases", _build_match_index)
+
+
+def _matching_known(index: dict, u: str) -> set[str]:
+    """Normalized known symptoms matching normalized user text u (equal or either contains the other)."""
+    keys = index["keys"]
+    return {keys[c] for c in match_columns(index["text"], u)}
 
 
 def get_possible_conditions_for_symptoms(symptoms: list[str], kb: dict | None = None) -> list[dict]:
     """
     Clinical decision support: given a list of symptoms, return possible conditions
-    with a match score. Each condition is augmented with:
+    with a match score. Each result has the condition's id and name (full record via
+    get_disease_by_id) and:
       - matched_symptoms: list of symptoms that matched
       - score: 0–1 (fraction of user symptoms that matched, weighted with fraction of condition symptoms covered)
+      - total_known_symptoms: number of symptoms the condition lists
     Sorted by score descending. Used when one symptom matches multiple diseases
     or when user enters multiple symptoms to narrow down conditions.
     """
     if kb is None:
-        kb = load_knowledge_base()
+        kb = _cached_kb()
     user_list = [s.strip() for s in symptoms if s and s.strip()]
     if not user_list:
         return []
 
+    index = _match_index(kb)
+    # Known symptoms (normalized) each user symptom matches: one pass over the unique
+    # known symptoms per user symptom, instead of a normalize-and-compare per disease.
+    # Only diseases listing one of them (from the inverted index) can match at all.
+    user_hits = [_matching_known(index, normalize_symptom_text(us)) for us in user_list]
+    arrays = index["arrays"]
+    if arrays is None:
+        candidates = set()
+        for hits in user_hits:
+            for k in hits:
+                candidates.update(index["postings"][k])
+        candidates, scores = sorted(candidates), None
+    else:
+        # Per disease, how many user symptoms hit one of its symptoms; then every
+        # candidate's score at once
+        n_hits = np.zeros(len(index["rows"]), dtype=np.int64)
+        for hits in user_hits:
+            if hits:
+                mask = np.zeros(len(index["rows"]), dtype=bool)
+                mask[np.concatenate([arrays["postings"][k] for k in hits])] = True
+                n_hits += mask
+        fired = np.flatnonzero(n_hits)
+        n = n_hits[fired]
+        candidates = fired.tolist()
+        scores = (0.6 * (n / len(user_list)) + 0.4 * (n / arrays["n_known"][fired])).tolist()
+
     results = []
-    for disease in kb.get("diseases", []):
-        known = [str(s).strip() for s in disease.get("symptoms") or []]
-        matched = []
-        for us in user_list:
-            for ks in known:
-                if _symptom_matches(us, ks):
-                    matched.append(ks)
+    for pos, i in enumerate(candidates):
+        disease, known, known_norm = index["rows"][i]
+        # n counts every user symptom that hit (the score); matched lists each known symptom once
+        matched, seen, n = [], set(), 0
+        for hits in user_hits:
+            for ks, k in zip(known, known_norm):
+                if k in hits:
+                    n += 1
+                    if ks not in seen:
+                        seen.add(ks)
+                        matched.append(ks)
                     break
-        if not matched:
+        if not n:
             continue
-        user_ratio = len(matched) / len(user_list)
-        condition_ratio = len(matched) / len(known) if known else 0
-        score = round(0.6 * user_ratio + 0.4 * condition_ratio, 2)
+        if scores is None:
+            user_ratio = n / len(user_list)
+            condition_ratio = n / len(known) if known else 0
+            score = round(0.6 * user_ratio + 0.4 * condition_ratio, 2)
+        else:
+            score = round(scores[pos], 2)
         results.append({
-            **disease,
-            "matched_symptoms": list(dict.fromkeys(matched)),
+            "id": disease.get("id"),
+            "name": disease.get("name"),
+            "matched_symptoms": matched,
             "score": score,
             "total_known_symptoms": len(known),
         })
@@ -108,7 +216,7 @@ def get_possible_conditions_for_symptoms(symptoms: list[str], kb: dict | None =
 def get_all_symptoms(kb: dict | None = None) -> list[str]:
     """Return sorted list of all unique symptoms in the knowledge base (for UI dropdowns)."""
     if kb is None:
-        kb = load_knowledge_base()
+        kb = _cached_kb()
     seen = set()
     for d in kb.get("diseases", []):
         for s in d.get("symptoms") or []:
@@ -121,24 +229,26 @@ def get_all_symptoms(kb: dict | None = None) -> list[str]:
 def get_disease_by_id(disease_id: str, kb: dict | None = None) -> dict | None:
     """Return the full disease object for the given id, or None."""
     if kb is None:
-        kb = load_knowledge_base()
-    for d in kb.get("diseases", []):
-        if d.get("id") == disease_id:
-            return d
-    return None
+        kb = _cached_kb()
+    return _match_index(kb)["by_id"].get(disease_id)
 
 
 def save_knowledge_base(kb: dict, filepath: str | None = None) -> None:
     """Write the knowledge base (with key 'diseases') to JSON."""
-    path = filepath or _data_path()
+    path = os.path.abspath(filepath or _data_path())
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(kb, f, indent=2, ensure_ascii=False)
+    write_json(path, kb)
+    # The saved content becomes the cached parse for that file (a top-level copy, as on load)
+    stat = os.stat(path)
+    _kb_cache[path] = ((stat.st_mtime_ns, stat.st_size), time.monotonic(), dict(kb))
+
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
 
 
 def _make_id(name: str, existing_ids: set[str]) -> str:
     """Generate a unique id from disease name (slug)."""
-    base = re.sub(r"[^\w\s]", "", name.lower()).replace(" ", "_")[:40] or "disease"
+    base = _PUNCT_RE.sub("", name.lower()).replace(" ", "_")[:40] or "disease"
     out = base
     i = 0
     while out in existing_ids or not out:
@@ -160,9 +270,9 @@ def add_disease(
     diseases = list(kb.get("diseases", []))
     existing_ids = {d.get("id", "") for d in diseases}
     new_id = _make_id(name, existing_ids)
-    symptoms_clean = [s.strip() for s in symptoms if s and str(s).strip()]
-    diagnostics_clean = [s.strip() for s in diagnostics if s and str(s).strip()]
-    treatment_clean = [s.strip() for s in treatment if s and str(s).strip()]
+    symptoms_clean = clean_list(symptoms)
+    diagnostics_clean = clean_list(diagnostics)
+    treatment_clean = clean_list(treatment)
     diseases.append({
         "id": new_id,
         "name": name.strip(),
@@ -194,9 +304,9 @@ def update_disease(
                 "id": disease_id,
                 "name": name.strip(),
                 "description": (description or "").strip(),
-                "symptoms": [s.strip() for s in symptoms if s and str(s).strip()],
-                "diagnostics": [s.strip() for s in diagnostics if s and str(s).strip()],
-                "treatment": [s.strip() for s in treatment if s and str(s).strip()],
+                "symptoms": clean_list(symptoms),
+                "diagnostics": clean_list(diagnostics),
+                "treatment": clean_list(treatment),
                 "references": (references or "").strip(),
             })
         else:
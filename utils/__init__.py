@@ -1,5 +1,6 @@
-# Utility helpers for formatting and display.
+# Utility helpers for formatting, display and per-kb caching.
 
-from utils.formatting import normalize_symptom_text
+from utils.caching import per_list_cache
+from utils.formatting import clean_list, normalize_symptom_text
 
-__all__ = ["normalize_symptom_text"]
+__all__ = ["clean_list", "normalize_symptom_text", "per_list_cache"]
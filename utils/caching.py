@@ -0,0 +1,93 @@
+"""
+Per-knowledge-base caches of values derived from its lists (lookup maps, symptom lists,
+match indexes), so repeated calls on an unchanged kb skip the rebuild.
+An entry is reused only while the kb is the same object and every list it was built from
+is the same list with the same length: the loader's mutators either append to those lists
+or replace them.
+"""
+
+from typing import Any, Callable
+
+# Entries kept per build function (oldest dropped first); the app holds one or two kbs at a time
+PER_LIST_CACHE_SIZE = 4
+
+# build function -> (id(owner), keys) -> (owner, lists, lengths, value)
+_caches: dict[Callable, dict[tuple, tuple]] = {}
+
+
+def _lists_at(owner: dict, keys: tuple[str, ...]) -> tuple:
+    """The value at each key in owner; a dotted key ("facts.symptoms") reads nested dicts. None if missing."""
+    out = []
+    for key in keys:
+        value: Any = owner
+        for part in key.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        out.append(value)
+    return tuple(out)
+
+
+def _keys_tuple(keys: str | tuple[str, ...]) -> tuple[str, ...]:
+    return (keys,) if isinstance(keys, str) else tuple(keys)
+
+
+def _lookup(owner: dict, keys: tuple[str, ...], build: Callable) -> tuple[dict, tuple, tuple, tuple]:
+    """(cache of build, slot, current lists, current entry or None if missing or stale)."""
+    cache = _caches.setdefault(build, {})
+    slot = (id(owner), keys)
+    lists = _lists_at(owner, keys)
+    hit = cache.get(slot)
+    if hit is not None and (
+        hit[0] is not owner
+        or any(a is not b for a, b in zip(hit[1], lists))
+        or hit[2] != tuple(len(x or ()) for x in lists)
+    ):
+        hit = None
+    return cache, slot, lists, hit
+
+
+def _store(cache: dict, slot: tuple, owner: dict, lists: tuple, value: Any, size: int) -> None:
+    if slot not in cache and len(cache) >= size:
+        cache.pop(next(iter(cache)))
+    cache[slot] = (owner, lists, tuple(len(x or ()) for x in lists), value)
+
+
+def per_list_cache(
+    owner: dict,
+    keys: str | tuple[str, ...],
+    build: Callable[..., Any],
+    size: int = PER_LIST_CACHE_SIZE,
+) -> Any:
+    """
+    build(*lists) for the lists at keys in owner (None where missing), reused while owner and
+    those lists are unchanged (see module docstring). The cached value is returned as is:
+    callers that hand it out copy it.
+    """
+    keys = _keys_tuple(keys)
+    cache, slot, lists, hit = _lookup(owner, keys, build)
+    if hit is not None:
+        return hit[3]
+    value = build(*lists)
+    _store(cache, slot, owner, lists, value, size)
+    return value
+
+
+def cached_per_list(owner: dict, keys: str | tuple[str, ...], build: Callable[..., Any]) -> Any:
+    """The value per_list_cache would reuse for owner and keys, or None if there is none."""
+    hit = _lookup(owner, _keys_tuple(keys), build)[3]
+    return None if hit is None else hit[3]
+
+
+def set_per_list_cache(
+    owner: dict,
+    keys: str | tuple[str, ...],
+    build: Callable[..., Any],
+    value: Any,
+    size: int = PER_LIST_CACHE_SIZE,
+) -> None:
+    """
+    Store value for owner's current lists at keys, for a caller that changed a list itself
+    (appended to it or replaced it) and updated the cached value to match.
+    """
+    keys = _keys_tuple(keys)
+    cache, slot, lists, _ = _lookup(owner, keys, build)
+    _store(cache, slot, owner, lists, value, size)
@@ -5,6 +5,11 @@ so "Runny Nose" and "runny nose" match; avoids false negatives from typing varia
 """
 
 import re
+import sys
+from functools import lru_cache
+from typing import Iterable
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
 
 
 def normalize_symptom_text(text: str) -> str:
@@ -14,5 +19,22 @@ def normalize_symptom_text(text: str) -> str:
     """
     if not text or not isinstance(text, str):
         return ""
-    cleaned = re.sub(r"[^\w\s]", "", text.lower())
-    return " ".join(cleaned.split())
+    return _normalize_str(text)
+
+
+def clean_list(items: Iterable | None) -> list[str]:
+    """Stripped, non-empty entries of a user-supplied list (each entry stripped once)."""
+    out = []
+    for s in items or ():
+        if not s:
+            continue
+        t = s.strip() if isinstance(s, str) else str(s).strip()
+        if t:
+            out.append(t)
+    return out
+
+
+@lru_cache(maxsize=8192)
+def _normalize_str(text: str) -> str:
+    """Memoized: the same few symptom strings are normalized over and over."""
+    return sys.intern(" ".join(_PUNCT_RE.sub("", text.lower()).split()))
@@ -0,0 +1,78 @@
+"""
+Substring matching between normalized symptom strings.
+Medical decision: a user symptom matches a known symptom when they are equal or either
+contains the other ("chest pain" matches "pain" and "severe chest pain"), so partial
+wording still finds the condition. The engines and the knowledge service share this rule.
+"""
+
+from bisect import bisect_right
+
+try:
+    import ahocorasick
+except ImportError:  # optional: one automaton pass for vocabulary entries inside a query
+    ahocorasick = None
+
+
+def symptoms_match(u: str, k: str) -> bool:
+    """True if normalized u and k are non-empty and equal, or one contains the other."""
+    if not u or not k:
+        return False
+    if u is k or u == k:  # normalized strings are interned: exact matches are one compare
+        return True
+    return u in k if len(u) <= len(k) else k in u
+
+
+def build_substring_index(vocab: dict[str, int]) -> dict:
+    """
+    Lookup tables for match_columns over a vocabulary of normalized symptoms, each mapped
+    to its column (0, 1, ... in insertion order): the entries joined by "\\n" (normalized
+    text has no newlines, so a match never spans two entries) with their start offsets,
+    the entry lengths, and an Aho-Corasick automaton of the entries if pyahocorasick is installed.
+    """
+    starts, offset = [], 0
+    for k in vocab:
+        starts.append(offset)
+        offset += len(k) + 1
+    automaton = None
+    if ahocorasick is not None and vocab:
+        automaton = ahocorasick.Automaton()
+        for k, col in vocab.items():
+            automaton.add_word(k, col)
+        automaton.make_automaton()
+    return {
+        "vocab": vocab,
+        "joined": "\n".join(vocab),
+        "starts": starts,
+        "lengths": sorted({len(k) for k in vocab}),
+        "automaton": automaton,
+    }
+
+
+def match_columns(text: dict, q: str) -> set[int]:
+    """
+    Columns of the vocabulary entries matching normalized query q (see symptoms_match),
+    without testing every entry:
+    - q inside an entry: str.find over the joined entries, skipping to the next entry per hit;
+    - an entry inside q: one automaton pass over q, or else dict lookups of q's substrings,
+      only at lengths the vocabulary has.
+    """
+    if not q:
+        return set()
+    vocab, joined, starts = text["vocab"], text["joined"], text["starts"]
+    cols: set[int] = set()
+    pos = joined.find(q)
+    while pos != -1:
+        col = bisect_right(starts, pos) - 1
+        cols.add(col)
+        pos = joined.find(q, starts[col + 1]) if col + 1 < len(starts) else -1
+    if text["automaton"] is not None:
+        cols.update(col for _, col in text["automaton"].iter(q))
+        return cols
+    for n in text["lengths"]:
+        if n >= len(q):  # equal length is covered by find; longer cannot be inside q
+            break
+        for i in range(len(q) - n + 1):
+            col = vocab.get(q[i:i + n])
+            if col is not None:
+                cols.add(col)
+    return cols